@@ -121,6 +121,7 @@ if __name__ == "__main__":
         output_directory="./",
         output_file="metadata.json",
         overwrite=True,
+        json_indent=4,
         auto_cleanup=True,
         add_description=True,
         add_type=True,
@@ -120,6 +120,7 @@ if __name__ == "__main__":
         output_directory="./",
         output_file="metadata.json",
         overwrite=True,
+        json_indent=4,
         auto_cleanup=True,
     )
 
@@ -119,6 +119,7 @@ if __name__ == "__main__":
         output_directory="./",
         output_file="metadata.json",
         overwrite=True,
+        json_indent=4,
         lazy_load=True,
         auto_cleanup=True,
         add_description=True,
@@ -14,8 +14,12 @@ Authors: Matthias K., Jose V.
 
 import logging
 
+from os import replace
+from pathlib import Path
 from shutil import rmtree
-from copy import deepcopy
+from hashlib import blake2b
+from json import dumps as j_dumps
+from pickle import load as p_load, dump as p_dump, HIGHEST_PROTOCOL, UnpicklingError
 from typing import Union, Iterable, Optional
 
 from metadata_archivist.parser import AParser
@@ -30,6 +34,8 @@ LOG = logging.getLogger(__name__)
 # "extraction_directory": string path to extraction directory (not used if exploring a directory). Default "." .
 # "output_directory": string path to output directory. Default "." .
 # "output_file": string name of resulting metadata file. Default "metadata.json" .
+# "parsing_workers": number of processes used to parse files, parsers need to be picklable if greater than 1.
+#                    Default 1 i.e. parsing in current process.
 # "lazy_load": control boolean to enable parser lazy loading. Needs compilation after parsing. Default False .
 # "overwrite": control boolean to allow overwriting existing metadata file. Default True .
 # "auto_cleanup": control boolean to clean up after generating metadata.
@@ -37,18 +43,30 @@ LOG = logging.getLogger(__name__)
 # "add_description": control boolean to add schema description attributes to resulting metadata. Default True .
 # "add_type": control boolean to add schema type attributes to resulting metadata. Default False .
 # "output_format": "string value of metadata file output format. Default "JSON" .
+# "json_indent": integer indentation level of JSON output, None for compact output. Default None .
+# "cache_compile": control boolean to store compiled metadata in a cache directory inside the output directory,
+#                   compiled metadata is reused in subsequent runs if explored files, parsers, schema,
+#                   and formatting configuration are unchanged. Changes in parser code are not detected.
+#                   Cache directory is kept on disk, auto_cleanup does not remove it. Default False .
 DEFAULT_CONFIG = {
     "extraction_directory": ".",
     "output_directory": ".",
     "output_file": "metadata.json",
+    "parsing_workers": 1,
     "lazy_load": False,
     "overwrite": True,
     "auto_cleanup": True,
     "add_description": False,
     "add_type": False,
     "output_format": "JSON",
+    "json_indent": None,
+    "cache_compile": False,
 }
 
+# Name of directory inside output directory used to store compiled metadata when "cache_compile" is enabled,
+# directory is not removed automatically and cache files accumulate with each distinct compilation input
+_COMPILE_CACHE_DIRECTORY = ".ma_cache"
+
 
 class Archivist:
     """
@@ -63,6 +81,20 @@ class Archivist:
         export: procedure that triggers export method.
     """
 
+    __slots__ = (
+        "config",
+        "_explorer",
+        "_formatter",
+        "_exporter",
+        "_extraction",
+        "_explored_path",
+        "_explored_files",
+        "_explored_dirs",
+        "_meta_files",
+        "_compile_metadata",
+        "_metadata",
+    )
+
     def __init__(
         self,
         path: str,
@@ -87,12 +119,17 @@ class Archivist:
         self.config = {}
         self._init_config(**kwargs)
 
-        # Operational memory
-        self._cache = {}
+        # Operational memory, set by parse and get_metadata
+        self._explored_path = None
+        self._explored_files = []
+        self._explored_dirs = []
+        self._meta_files = []
+        self._compile_metadata = False
+        self._metadata = None
 
         # Set explorer
         self._explorer = Explorer(path, self.config)
-        self._cache["extraction"] = self._explorer.path_is_archive
+        self._extraction = self._explorer.path_is_archive
 
         # Set formatter
         self._formatter = Formatter(parsers, schema, self.config)
@@ -108,13 +145,15 @@ class Archivist:
         Keyword arguments: new values for _DEFAULT_CONFIG dict copy.
         """
 
-        self.config = deepcopy(DEFAULT_CONFIG)
+        # Configuration only contains immutable values, shallow copies are sufficient here and wherever it is copied
+        self.config = DEFAULT_CONFIG.copy()
         key_list = list(self.config.keys())
 
         # Init rest of config params
         for key, value in kwargs.items():
             if key in self.config:
-                if isinstance(value, type(self.config[key])):
+                # Optional parameters (None by default) accept any type
+                if self.config[key] is None or isinstance(value, type(self.config[key])):
                     self.config[key] = value
                     key_list.remove(key)
                 else:
@@ -126,7 +165,7 @@ class Archivist:
             LOG.debug(
                 "No argument found for '%s' initializing by default '%s'",
                 key,
-                str(self.config[key]),
+                self.config[key],
             )
 
     def parse(self) -> None:
@@ -139,11 +178,11 @@ class Archivist:
 
         meta_files = self._formatter.parse_files(explored_path, explored_files)
 
-        self._cache["explored_path"] = explored_path
-        self._cache["explored_files"] = explored_files
-        self._cache["explored_dirs"] = explored_dirs
-        self._cache["meta_files"] = meta_files
-        self._cache["compile_metadata"] = True
+        self._explored_path = explored_path
+        self._explored_files = explored_files
+        self._explored_dirs = explored_dirs
+        self._meta_files = meta_files
+        self._compile_metadata = True
 
     def get_metadata(self) -> dict:
         """
@@ -154,12 +193,78 @@ class Archivist:
             dictionary of parsed metadata.
         """
 
-        if self._cache["compile_metadata"]:
-            self._cache["compile_metadata"] = False
-            self._cache["metadata"] = self._formatter.compile_metadata()
+        if self._compile_metadata:
+            self._compile_metadata = False
+            if self.config["cache_compile"]:
+                self._metadata = self._cached_compile()
+            else:
+                self._metadata = self._formatter.compile_metadata()
             self._clean_up()
 
-        return self._cache["metadata"]
+        return self._metadata
+
+    def _compile_digest(self) -> str:
+        """
+        Computes digest of metadata compilation inputs i.e.
+        explored files (path, size, and modification time), parsers, schema, and formatting configuration.
+
+        Returns:
+            hexadecimal digest string.
+        """
+
+        hasher = blake2b(digest_size=16)
+        for fp in sorted(self._explored_files):
+            file_stat = fp.stat()
+            hasher.update(f"{fp}:{file_stat.st_size}:{file_stat.st_mtime_ns};".encode("utf-8"))
+        for parser in self._formatter.parsers:
+            parser_type = f"{type(parser).__module__}.{type(parser).__qualname__}"
+            hasher.update(f"{parser_type}:{parser.name}:{parser.input_file_pattern};".encode("utf-8"))
+            hasher.update(j_dumps(parser.schema, sort_keys=True, default=str).encode("utf-8"))
+        hasher.update(j_dumps(self._formatter.schema, sort_keys=True, default=str).encode("utf-8"))
+        formatting_config = {key: self.config[key] for key in ("add_description", "add_type")}
+        hasher.update(j_dumps(formatting_config, sort_keys=True).encode("utf-8"))
+
+        return hasher.hexdigest()
+
+    def _cached_compile(self) -> dict:
+        """
+        Fetches compiled metadata from cache directory if compilation inputs are unchanged,
+        otherwise uses Formatter to compile metadata and stores result in cache directory.
+
+        Returns:
+            dictionary of parsed metadata.
+        """
+
+        cache_directory = Path(self.config["output_directory"]) / _COMPILE_CACHE_DIRECTORY
+        cache_file = cache_directory / f"{self._compile_digest()}.pkl"
+
+        if cache_file.is_file():
+            LOG.info("Loading compiled metadata from cache '%s'", cache_file)
+            try:
+                with cache_file.open("rb") as f:
+                    metadata = p_load(f)
+            except (EOFError, UnpicklingError) as e:
+                # Unreadable cache entry is replaced by compiling metadata again
+                LOG.warning("Corrupted compiled metadata cache '%s', compiling again: %s", cache_file, e)
+            else:
+                self._formatter.metadata = metadata
+                return metadata
+
+        metadata = self._formatter.compile_metadata()
+
+        # Cache entry is written to a temporary file which then atomically replaces the cache file,
+        # such that an interrupted write never leaves a truncated cache entry behind
+        cache_directory.mkdir(parents=True, exist_ok=True)
+        temp_file = cache_file.with_name(f"{cache_file.name}.tmp")
+        try:
+            with temp_file.open("wb") as f:
+                p_dump(metadata, f, protocol=HIGHEST_PROTOCOL)
+            replace(temp_file, cache_file)
+        except BaseException:
+            temp_file.unlink(missing_ok=True)
+            raise
+
+        return metadata
 
     def get_formatted_schema(self) -> dict:
         """Returns schema from Formatter."""
@@ -173,32 +278,27 @@ class Archivist:
         """
         Cleanup method automatically called in get_metadata,
         deletes extraction directory (if extraction happened) and meta files (if lazy loading).
+        Compiled metadata cache directory (if cache_compile enabled) is kept to be reused in subsequent runs.
         """
 
         if self.config["auto_cleanup"]:
-            if self._cache["extraction"]:
-                root_extraction_path = self._cache["explored_dirs"][0]
-                LOG.info("Cleaning extraction directory '%s'", str(root_extraction_path))
+            if self._extraction:
+                root_extraction_path = self._explored_dirs[0]
+                LOG.info("Cleaning extraction directory '%s'", root_extraction_path)
                 try:
                     rmtree(root_extraction_path)
                 except OSError as e:
                     LOG.warning(
                         "error cleaning '%s' - '%s'",
-                        str(root_extraction_path),
+                        root_extraction_path,
                         e.message if hasattr(e, "message") else str(e),
                     )
 
-            elif len(self._cache["meta_files"]) > 0:
-                for fp in self._cache["meta_files"]:
-                    LOG.info("Cleaning meta file '%s'", str(fp))
-                    try:
-                        fp.unlink()
-                    except FileNotFoundError as e:
-                        LOG.warning(
-                            "error cleaning '%s' - '%s'",
-                            str(fp),
-                            e.message if hasattr(e, "message") else str(e),
-                        )
+            # When extracting, meta files are stored next to extracted files and removed with the extraction directory
+            elif len(self._meta_files) > 0:
+                LOG.info("Cleaning %d meta files", len(self._meta_files))
+                for fp in self._meta_files:
+                    fp.unlink(missing_ok=True)
             else:
                 LOG.info("Nothing to clean.")
                 return
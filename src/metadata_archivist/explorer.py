@@ -15,13 +15,15 @@ Authors: Jose V., Matthias K.
 import logging
 
 from pathlib import Path
-from functools import partial
-from zipfile import is_zipfile
-from collections.abc import Callable
-from typing import List, Tuple, Union
+from re import fullmatch, error as re_error, Pattern
+from os import scandir, DirEntry
+from stat import S_ISREG
+from functools import partial, lru_cache
+from collections.abc import Callable, Iterator
+from typing import List, Tuple, Union, Optional
 from tarfile import is_tarfile, TarFile, open as t_open
 
-from metadata_archivist.helper_functions import pattern_parts_match, check_dir
+from metadata_archivist.helper_functions import pattern_parts_match, compile_pattern_parts, check_dir
 
 
 LOG = logging.getLogger(__name__)
@@ -29,6 +31,12 @@ LOG = logging.getLogger(__name__)
 # Accepted archive file formats
 _ACCEPTED_FORMATS = list(TarFile.OPEN_METH.keys()) + ["tgz", "txz", "tbz", "tbz2"]
 
+# Accepted archive file suffixes, as a tuple to be directly used with str.endswith
+_ACCEPTED_SUFFIXES = tuple(f".{format}" for format in _ACCEPTED_FORMATS)
+
+# Buffer size in bytes used to copy member data when extracting from archives
+_COPY_BUFSIZE = 1024 * 1024
+
 
 class Explorer:
     """
@@ -102,14 +110,21 @@ def _check_archive(file_path: Path, extraction_directory: str) -> Tuple[Path, Ca
         callable method to decompress corresponding archive type.
     """
 
-    if not file_path.is_file():
-        LOG.debug("Path to file '%s'", str(file_path))
+    try:
+        file_stat = file_path.stat()
+    except OSError:
+        file_stat = None
+
+    if file_stat is None or not S_ISREG(file_stat.st_mode):
+        LOG.debug("Path to file '%s'", file_path)
         raise FileNotFoundError("Incorrect path to file.")
 
-    if is_zipfile(file_path):
+    archive_type = _probe_archive(str(file_path), file_stat.st_mtime_ns, file_stat.st_size)
+
+    if archive_type == "zip":
         raise NotImplementedError("ZIP extractor not yet implemented.")
 
-    if is_tarfile(file_path):
+    if archive_type == "tar":
         decompress_method = partial(
             _decompress_tar,
             archive_path=file_path,
@@ -123,6 +138,76 @@ def _check_archive(file_path: Path, extraction_directory: str) -> Tuple[Path, Ca
     raise RuntimeError("Unknown archive format.")
 
 
+@lru_cache(maxsize=4096)
+def _probe_archive(file_path: str, mtime_ns: int, size: int) -> Optional[str]:
+    """
+    Probes archive type by reading file header.
+    Results are cached, modification time and size are part of the cache key
+    such that modified files are probed again.
+
+    Arguments:
+        file_path: string of path to file.
+        mtime_ns: integer modification time of file in nanoseconds.
+        size: integer size of file in bytes.
+
+    Returns:
+        "zip" or "tar" string if archive type is known, None otherwise.
+    """
+
+    # zipfile is only needed to probe archives, not when exploring directories
+    from zipfile import is_zipfile
+
+    if is_zipfile(file_path):
+        return "zip"
+    if is_tarfile(file_path):
+        return "tar"
+    return None
+
+
+def _prepare_patterns(input_file_patterns: List[str]) -> List[Tuple[Union[str, Pattern], ...]]:
+    """
+    Splits input file patterns into path parts in reverse order, as expected by pattern_parts_match.
+    Pattern parts are compiled once, each pattern on its own such that groups and backreferences are kept,
+    the file name part is then used as a cheap filter before matching remaining parts.
+
+    Arguments:
+        input_file_patterns: list of string of patterns of files.
+
+    Returns:
+        list of tuples of compiled pattern parts in reverse order,
+        pattern parts are kept as strings if a pattern cannot be compiled.
+    """
+
+    reversed_patterns = []
+    for pat in input_file_patterns:
+        pattern_parts = pat.split("/")[::-1]
+        try:
+            reversed_patterns.append(tuple(compile_pattern_parts(pattern_parts)))
+        except re_error:
+            LOG.debug("   pattern '%s' could not be compiled", pat)
+            reversed_patterns.append(tuple(pattern_parts))
+
+    return reversed_patterns
+
+
+def _match_patterns(reversed_patterns: List[Tuple[Union[str, Pattern], ...]], item_parts: Tuple[str, ...]) -> bool:
+    """
+    Matches path parts in reverse order against prepared input file patterns.
+
+    Arguments:
+        reversed_patterns: list of split, reversed, and compiled input file patterns.
+        item_parts: tuple of path parts in reverse order.
+
+    Returns:
+        True if any pattern matches.
+    """
+
+    name = item_parts[0]
+    return any(
+        fullmatch(pat[0], name) is not None and pattern_parts_match(pat, item_parts) for pat in reversed_patterns
+    )
+
+
 def _decompress_tar(
     input_file_patterns: List[str],
     archive_path: Path,
@@ -130,7 +215,8 @@ def _decompress_tar(
 ) -> Tuple[Path, List[Path], List[Path]]:
     """
     Decompresses files found in archive pointed by self.path.
-    If an archive is found inside then operation is recursively called on it.
+    If an archive is found inside then it is decompressed directly from the parent archive stream,
+    without writing the nested archive to disk.
 
     Arguments:
         input_file_patterns: list of string of patterns of files to decompress.
@@ -145,7 +231,7 @@ def _decompress_tar(
     """
 
     LOG.info("Extracting archive '%s' ...", archive_path.name)
-    LOG.debug("   exploring using patterns '%s'", str(input_file_patterns))
+    LOG.debug("   exploring using patterns '%s'", input_file_patterns)
 
     created = False
     if not isinstance(extraction_directory, Path):
@@ -156,34 +242,12 @@ def _decompress_tar(
     explored_dirs = [directory_path] if not created else [extraction_directory, directory_path]
     explored_files = []
 
-    with t_open(archive_path) as t:
-        item = t.next()
-        while item is not None:
-            if item.isfile():
-                LOG.debug("   processing file '%s'", item.name)
-                item_path = directory_path.joinpath(item.name)
-                if any(item.name.endswith(format) for format in _ACCEPTED_FORMATS):
-                    t.extract(item, path=directory_path)
-                    _, new_explored_dirs, new_explored_files = _decompress_tar(
-                        input_file_patterns,
-                        archive_path=item_path,
-                        extraction_directory=item_path.parent,
-                    )
-                    explored_dirs.extend(new_explored_dirs)
-                    explored_files.extend(new_explored_files)
-                    item_path.unlink()
-
-                elif any(
-                    pattern_parts_match(
-                        list(reversed(pat.split("/"))),
-                        list(reversed(item.name.split("/"))),
-                    )
-                    for pat in input_file_patterns
-                ):
-                    t.extract(item, path=directory_path)
-                    explored_files.append(item_path)
-                    explored_dirs.append(item_path.parent)
-            item = t.next()
+    # Patterns are prepared once for all archive members
+    reversed_patterns = _prepare_patterns(input_file_patterns)
+
+    # Archive is read in streaming mode as members are only processed in storage order
+    with t_open(archive_path, mode="r|*", copybufsize=_COPY_BUFSIZE) as t:
+        _extract_tar(t, directory_path, reversed_patterns, explored_dirs, explored_files)
 
     LOG.info("Done!")
 
@@ -191,9 +255,56 @@ def _decompress_tar(
     return directory_path, explored_dirs, explored_files
 
 
+def _extract_tar(
+    tar: TarFile,
+    directory_path: Path,
+    reversed_patterns: List[Tuple[Union[str, Pattern], ...]],
+    explored_dirs: List[Path],
+    explored_files: List[Path],
+) -> None:
+    """
+    Extracts matching members of an archive opened in streaming mode,
+    in place updates of explored directories and files.
+    Members are processed in storage order, nested archives are opened in streaming mode
+    on the member data and recursively extracted while being the current member.
+
+    Arguments:
+        tar: opened TarFile to extract from.
+        directory_path: Path object of decompression directory.
+        reversed_patterns: list of split, reversed, and compiled input file patterns.
+        explored_dirs: list of Path objects of decompressed directories to update.
+        explored_files: list of Path objects of decompressed files to update.
+    """
+
+    for item in tar:
+        if item.isreg():
+            LOG.debug("   processing file '%s'", item.name)
+            item_path = directory_path.joinpath(item.name)
+            if item.name.endswith(_ACCEPTED_SUFFIXES):
+                LOG.info("Extracting archive '%s' ...", item_path.name)
+                nested_directory = item_path.parent.joinpath(item_path.stem.split(".")[0])
+                explored_dirs.append(nested_directory)
+                with t_open(fileobj=tar.extractfile(item), mode="r|*", copybufsize=_COPY_BUFSIZE) as nested:
+                    _extract_tar(
+                        nested,
+                        nested_directory,
+                        reversed_patterns,
+                        explored_dirs,
+                        explored_files,
+                    )
+
+            else:
+                item_parts = tuple(item.name.split("/")[::-1])
+                if _match_patterns(reversed_patterns, item_parts):
+                    tar.extract(item, path=directory_path)
+                    explored_files.append(item_path)
+                    explored_dirs.append(item_path.parent)
+
+
 def _dir_explore(input_file_patterns: List[str], directory_path: Path) -> Tuple[Path, List[Path], List[Path]]:
     """
-    Explores given directory while matching files and recursing over sub-directories.
+    Explores given directory while matching files and walking over sub-directories.
+    Walk is done depth first using a stack of directory scans instead of recursion.
     Paths are assumed to be checked before call.
 
     Arguments:
@@ -208,26 +319,52 @@ def _dir_explore(input_file_patterns: List[str], directory_path: Path) -> Tuple[
     """
 
     LOG.info("Exploring directory '%s' ...", directory_path.name)
-    LOG.debug("   exploring using patterns '%s'", str(input_file_patterns))
+    LOG.debug("   exploring using patterns '%s'", input_file_patterns)
+
+    reversed_patterns = _prepare_patterns(input_file_patterns)
 
     explored_dirs = [directory_path]
     explored_files = []
 
-    for item_path in directory_path.glob("*"):
-        if item_path.is_file():
-            LOG.debug("   processing file '%s'", item_path.name)
-            if any(
-                pattern_parts_match(list(reversed(pat.split("/"))), list(reversed(item_path.parts)))
-                for pat in input_file_patterns
-            ):
-                explored_files.append(item_path)
-                explored_dirs.append(item_path.parent)
-        else:
-            _, new_explored_dirs, new_explored_files = _dir_explore(input_file_patterns, item_path)
-            explored_dirs.extend(new_explored_dirs)
-            explored_files.extend(new_explored_files)
+    # Each stack frame contains a directory Path, its parts in reverse order, and an iterator over its entries
+    stack = [(directory_path, directory_path.parts[::-1], _scan_dir(directory_path))]
+    while len(stack) > 0:
+        current_path, current_parts, entries = stack[-1]
+        entry = next(entries, None)
+
+        if entry is None:
+            stack.pop()
+
+        elif entry.is_file():
+            LOG.debug("   processing file '%s'", entry.name)
+            item_parts = (entry.name,) + current_parts
+            if _match_patterns(reversed_patterns, item_parts):
+                explored_files.append(current_path.joinpath(entry.name))
+                explored_dirs.append(current_path)
+
+        elif entry.is_dir():
+            LOG.debug("   exploring directory '%s'", entry.name)
+            sub_path = current_path.joinpath(entry.name)
+            explored_dirs.append(sub_path)
+            stack.append((sub_path, (entry.name,) + current_parts, _scan_dir(sub_path)))
 
     LOG.info("Done!")
 
     # Returned paths are used for parsing and automatic clean-up.
     return directory_path, explored_dirs, explored_files
+
+
+def _scan_dir(directory_path: Path) -> Iterator[DirEntry]:
+    """
+    Scans directory entries.
+    Entries are read at once such that the directory handle is closed before walking over them.
+
+    Arguments:
+        directory_path: Path object of directory to scan.
+
+    Returns:
+        iterator over directory entries.
+    """
+
+    with scandir(directory_path) as it:
+        return iter(list(it))
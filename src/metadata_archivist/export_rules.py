@@ -23,52 +23,194 @@ Authors: Jose V., Matthias K.
 
 import logging
 
+from math import isfinite
 from pathlib import Path
-from typing import Callable
-from json import dump as j_dump
+from typing import Any, Callable, Optional
+from json import dumps as j_dumps
 from pickle import dump as p_dump, HIGHEST_PROTOCOL
 
 
 LOG = logging.getLogger(__name__)
 
+# Try to load orjson for faster JSON export
+# In case of failure, standard json module is used
 try:
-    from yaml import dump as y_dump
+    from orjson import dumps as o_dumps, JSONEncodeError, OPT_INDENT_2, OPT_NON_STR_KEYS
+
+    _USE_ORJSON = True
+
 except ImportError:
+    _USE_ORJSON = False
 
-    def y_dump(*args, **kwargs):
-        """Mock yaml dump function when PyYAML not found."""
-        raise ModuleNotFoundError("PyYAML package was not found in environment.")
+# Buffer size in bytes used when writing export files
+_WRITE_BUFSIZE = 1024 * 1024
 
 
 def _export_yaml(export_object: dict, outfile: Path) -> None:
     # Exports YAML object to file.
+    # PyYAML is only imported when exporting to YAML.
+    # The libyaml based dumper is used when PyYAML was built with it.
+
+    try:
+        from yaml import dump as y_dump
+    except ImportError as e:
+        raise ModuleNotFoundError("PyYAML package was not found in environment.") from e
 
-    LOG.debug("   exporting YAML to file '%s'", str(outfile))
+    try:
+        from yaml import CDumper as Dumper
+    except ImportError:
+        from yaml import Dumper
 
-    with outfile.open("w", encoding="utf-8") as f:
-        y_dump(export_object, f, sort_keys=False)
+    LOG.debug("   exporting YAML to file '%s'", outfile)
+
+    with outfile.open("w", encoding="utf-8", buffering=_WRITE_BUFSIZE) as f:
+        y_dump(export_object, f, Dumper=Dumper, sort_keys=False)
 
 
 def _export_pickle(export_object: dict, outfile: Path) -> None:
     # Pickles object to file.
 
-    LOG.debug("   exporting pickle to file '%s'", str(outfile))
+    LOG.debug("   exporting pickle to file '%s'", outfile)
 
-    with outfile.open("wb", encoding=None) as f:
+    with outfile.open("wb", buffering=_WRITE_BUFSIZE) as f:
         p_dump(export_object, f, protocol=HIGHEST_PROTOCOL)
 
 
-def _export_json(export_object: dict, outfile: Path) -> None:
-    # Exports JSON export_object to file.
+def _export_msgpack(export_object: dict, outfile: Path) -> None:
+    # Exports MessagePack binary object to file.
+    # msgpack is only imported when exporting to MessagePack.
 
-    LOG.debug("   exporting JSON to file '%s'", str(outfile))
+    try:
+        from msgpack import packb
+    except ImportError as e:
+        raise ModuleNotFoundError(
+            "msgpack package was not found in environment, it is needed to export MessagePack "
+            "and can be installed with the msgpack extra."
+        ) from e
 
-    with outfile.open("w", encoding="utf-8") as f:
-        j_dump(export_object, f, indent=4)
+    LOG.debug("   exporting MessagePack to file '%s'", outfile)
+
+    with outfile.open("wb", buffering=_WRITE_BUFSIZE) as f:
+        f.write(packb(export_object, use_bin_type=True))
+
+
+def _export_json(export_object: dict, outfile: Path, indent: Optional[int] = None) -> None:
+    # Exports JSON export_object to file.
+    # Output is compact unless an indentation level is given, the exporter provides it from configuration.
+    # orjson is used if available and indentation is either none or 2 spaces (only level supported by orjson),
+    # standard json module is used otherwise or if orjson fails to serialize the object.
+    # orjson encodes non-finite floats as null while the json module writes NaN and Infinity,
+    # hence the json module is also used if the object contains non-finite floats.
+    # Object is serialized at once and written in a single call to a binary file,
+    # for compact output this also lets the json module use its C encoder.
+
+    LOG.debug("   exporting JSON to file '%s'", outfile)
+
+    encoded = None
+    if _USE_ORJSON and indent in (None, 2):
+        option = OPT_NON_STR_KEYS if indent is None else OPT_NON_STR_KEYS | OPT_INDENT_2
+        try:
+            encoded = o_dumps(export_object, option=option)
+        except JSONEncodeError as e:
+            LOG.debug("   orjson serialization failed '%s', falling back to json module", e)
+        # Non-finite floats can only be present if null was written
+        if encoded is not None and b"null" in encoded and _contains_non_finite(export_object):
+            LOG.debug("   non-finite float found, falling back to json module")
+            encoded = None
+
+    if encoded is None:
+        separators = (",", ":") if indent is None else None
+        encoded = j_dumps(export_object, indent=indent, separators=separators).encode("utf-8")
+
+    with outfile.open("wb", buffering=_WRITE_BUFSIZE) as f:
+        f.write(encoded)
+
+
+def _contains_non_finite(value: Any) -> bool:
+    # Checks if nested dictionaries and lists contain non-finite floats, as keys or values.
+
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+    return False
+
+
+def _export_json_stream(export_object: dict, outfile: Path) -> None:
+    # Exports JSON export_object to file while encoding it incrementally.
+    # Nested dictionaries and lists are walked and written token by token,
+    # such that the complete encoded document is never held in memory.
+    # Output is always compact, json_indent configuration is ignored.
+
+    LOG.debug("   exporting streamed JSON to file '%s'", outfile)
+
+    with outfile.open("wb", buffering=_WRITE_BUFSIZE) as f:
+        _stream_json(export_object, f.write)
+
+
+def _stream_json(value: Any, write: Callable) -> None:
+    # Recursively writes JSON encoding of value through write callable.
+    # Lists without nested containers are encoded at once.
+
+    if isinstance(value, dict):
+        write(b"{")
+        first = True
+        for key, item in value.items():
+            if not first:
+                write(b",")
+            first = False
+            # Same key conversion as json module
+            if isinstance(key, str):
+                write(_encode_json_value(key))
+            elif key is None or isinstance(key, (int, float)):
+                write(_encode_json_value(j_dumps(key)))
+            else:
+                raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+            write(b":")
+            _stream_json(item, write)
+        write(b"}")
+
+    elif isinstance(value, (list, tuple)) and any(isinstance(item, (dict, list, tuple)) for item in value):
+        write(b"[")
+        first = True
+        for item in value:
+            if not first:
+                write(b",")
+            first = False
+            _stream_json(item, write)
+        write(b"]")
+
+    else:
+        write(_encode_json_value(value))
+
+
+def _encode_json_value(value: Any) -> bytes:
+    # Encodes value to compact JSON bytes, using orjson if available.
+    # As in _export_json, json module is used for values containing non-finite floats.
+
+    if _USE_ORJSON:
+        try:
+            encoded = o_dumps(value, option=OPT_NON_STR_KEYS)
+            if b"null" not in encoded or not _contains_non_finite(value):
+                return encoded
+        except JSONEncodeError:
+            pass
+
+    return j_dumps(value, separators=(",", ":")).encode("utf-8")
 
 
 EXPORT_RULES = {
     "JSON": _export_json,
+    "JSON_STREAM": _export_json_stream,
+    "MSGPACK": _export_msgpack,
     "PICKLE": _export_pickle,
     "YAML": _export_yaml,
 }
@@ -77,12 +219,14 @@ EXPORT_RULES = {
 def register_export_rule(format_name: str, rule: Callable) -> None:
     """
     Function to register new rules in the EXPORT_RULES dictionary.
+    Format names are stored in upper case, as output format is matched case insensitively.
 
     Arguments:
         format_name: string name of format to export.
         rule: callable rule to export to new format.
     """
 
+    format_name = format_name.upper()
     if format_name in EXPORT_RULES:
         raise KeyError("Export rule already exists")
 
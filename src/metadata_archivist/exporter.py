@@ -14,8 +14,12 @@ Authors: Jose V., Matthias K.
 
 import logging
 
+from stat import S_ISREG
+from functools import partial
+from os import open as os_open, close, replace, O_WRONLY, O_CREAT, O_EXCL
+
 from metadata_archivist.helper_functions import check_dir
-from metadata_archivist.export_rules import EXPORT_RULES, register_export_rule
+from metadata_archivist.export_rules import EXPORT_RULES, register_export_rule, _export_json
 
 
 LOG = logging.getLogger(__name__)
@@ -42,6 +46,10 @@ class Exporter:
 
         self.config = config
 
+        # Export rule resolved from output format, cached along with the format and indentation it was resolved for
+        self._export_format = None
+        self._export_rule = None
+
     def export(self, metadata: dict) -> None:
         """
         Exports given metadata dictionary to file.
@@ -53,28 +61,69 @@ class Exporter:
 
         LOG.info("Exporting metadata ...")
 
-        export_format = self.config["output_format"].upper()
-        if export_format not in EXPORT_RULES:
-            LOG.debug("Export format type '%s'", export_format)
-            raise RuntimeError("Unknown export format type.")
-        export_directory = check_dir(self.config["output_directory"], allow_existing=True)[0]
-        export_file = export_directory / self.config["output_file"]
-
-        if export_file.exists():
-            if export_file.is_file():
-                if self.config["overwrite"]:
+        config = self.config
+
+        # Rule is only resolved again if output format or JSON indentation changed,
+        # resolution is not done at construction as rules can be registered afterwards
+        # JSON indentation is optional in configuration, compact output by default
+        json_indent = config.get("json_indent")
+        if (config["output_format"], json_indent) != self._export_format:
+            export_format = config["output_format"].upper()
+            if export_format not in EXPORT_RULES:
+                LOG.debug("Export format type '%s'", export_format)
+                raise RuntimeError("Unknown export format type.")
+            export_rule = EXPORT_RULES[export_format]
+            # Export rules only take the object and file to export,
+            # indentation configuration is bound to the built-in JSON rule
+            if export_rule is _export_json:
+                export_rule = partial(export_rule, indent=json_indent)
+            self._export_rule = export_rule
+            self._export_format = (config["output_format"], json_indent)
+
+        export_directory = check_dir(config["output_directory"], allow_existing=True)[0]
+        export_file = export_directory / config["output_file"]
+
+        # Single stat call for both existence and file type checks.
+        # If overwriting is not allowed, output file is first reserved through exclusive creation,
+        # such that existence check and creation are atomic, stat is then only needed if file already exists.
+        file_stat = None
+        if config["overwrite"]:
+            try:
+                file_stat = export_file.stat()
+            except FileNotFoundError:
+                pass
+        else:
+            try:
+                close(os_open(export_file, O_WRONLY | O_CREAT | O_EXCL, 0o666))
+            except FileExistsError:
+                file_stat = export_file.stat()
+
+        if file_stat is not None:
+            if S_ISREG(file_stat.st_mode):
+                if config["overwrite"]:
                     LOG.warning(
                         "Metadata output file exists '%s', overwriting.",
-                        str(export_file),
+                        export_file,
                     )
                 else:
-                    LOG.debug("Metadata export file path '%s'", str(export_file))
+                    LOG.debug("Metadata export file path '%s'", export_file)
                     raise RuntimeError("Metadata output file exists; overwriting not allowed.")
             else:
-                LOG.debug("Metadata export file path '%s' not a file", str(export_file))
+                LOG.debug("Metadata export file path '%s' not a file", export_file)
                 raise RuntimeError("Conflicting path to metadata output file; cannot overwrite.")
 
-        EXPORT_RULES[export_format](metadata, export_file)
+        # Export rule writes to a temporary file which then atomically replaces the output file,
+        # such that a failed export never leaves a partially written output file behind
+        temp_file = export_file.with_name(f"{export_file.name}.tmp")
+        try:
+            self._export_rule(metadata, temp_file)
+            replace(temp_file, export_file)
+        except BaseException:
+            temp_file.unlink(missing_ok=True)
+            # Release reserved output file
+            if not config["overwrite"]:
+                export_file.unlink(missing_ok=True)
+            raise
 
         LOG.info("Done!")
 
@@ -17,8 +17,10 @@ Authors: Jose V., Matthias K.
 import logging
 
 from pathlib import Path
-from copy import deepcopy
-from json import load, dumps
+from hashlib import blake2b
+from operator import itemgetter
+from re import compile as re_compile, Pattern
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional, List, Iterable, NoReturn, Union, Tuple
 
 from metadata_archivist.parser import AParser
@@ -32,11 +34,29 @@ from metadata_archivist.helper_functions import (
     merge_dicts,
     pattern_parts_match,
     remove_directives_from_schema,
+    LazyDumps,
+    json_loads,
 )
 
 
 LOG = logging.getLogger(__name__)
 
+# Number of parsing results held in memory before being saved together to meta files when lazy loading
+_SAVE_BATCH_SIZE = 64
+
+# Number of chunks of files sent to each worker process when parsing in a process pool,
+# more chunks balance load between workers while fewer chunks reduce pickling of Parsers
+_CHUNKS_PER_WORKER = 4
+
+# Characters replaced in Parser names to generate meta file names, and maximum length kept from Parser names
+_UNSAFE_FILE_NAME_CHARACTER = re_compile(r"[^0-9A-Za-z_.-]")
+_MAX_SAFE_NAME_LENGTH = 64
+
+# Regex patterns matching only a single literal string i.e. without special characters
+# other than escaped non alphanumeric characters, and escape sequence to unescape such patterns
+_LITERAL_PATTERN = re_compile(r"(?:[^.^$*+?{}\[\]\\|()]|\\[^0-9A-Za-z])*")
+_ESCAPED_CHARACTER = re_compile(r"\\(.)")
+
 
 class Formatter:
     """
@@ -84,15 +104,18 @@ class Formatter:
         # Wrapped attributes:
         # These attributes should only be modified through the add, update remove methods
         self._parsers = []
+        # Parsers by name, for constant time membership checks and lookups
+        self._parsers_by_name = {}
         self._input_file_patterns = []
+        # Prepared input file patterns (see _prepare_pattern), same indexes as patterns list
+        self._prepared_patterns = []
         # Can also be completely replaced through set method
         if schema is not None:
             if isinstance(schema, dict):
                 self._schema = schema
             elif isinstance(schema, (str, Path)):
                 schema_path = Path(schema)
-                with schema_path.open("r", encoding="utf-8") as f:
-                    self._schema = load(f)
+                self._schema = json_loads(schema_path.read_bytes())
             else:
                 raise TypeError("Schema must be dict or Path.")
         else:
@@ -105,6 +128,10 @@ class Formatter:
 
         # Attribute for SchemaInterpreter
         self._interpreter = None
+        # Interpreted schema, reset whenever schema is modified
+        self._interpreted_schema = None
+        # Schema without directives, reset whenever schema is modified
+        self._exported_schema = None
 
         # Used for updating/removing parsers
         # Indexing is done storing a triplet with parsers, patterns, schema indexes
@@ -173,6 +200,8 @@ class Formatter:
 
         self._schema = schema
         self._use_schema = True
+        self._interpreted_schema = None
+        self._exported_schema = None
         if len(self._parsers) > 0:
             for ex in self._parsers:
                 self._extend_json_schema(ex)
@@ -180,6 +209,7 @@ class Formatter:
     def export_schema(self) -> dict:
         """
         Removes interpretation directives from schema, such that result respects JSONSchema standard.
+        Result is cached until schema is modified through Formatter, it should not be modified by caller.
 
         Returns:
             cleaned schema dictionary.
@@ -188,7 +218,10 @@ class Formatter:
         if not self._use_schema:
             return None
 
-        return remove_directives_from_schema(self._schema)
+        if self._exported_schema is None:
+            self._exported_schema = remove_directives_from_schema(self._schema)
+
+        return self._exported_schema
 
     def set_lazy_load(self, lazy_load: bool) -> None:
         """
@@ -213,14 +246,12 @@ class Formatter:
         """
         Extends self contained schema with schema from input Parser.
         Uses ParserIndexes class for easier indexing.
+        Callers are expected to check that schema usage is enabled.
 
         Arguments:
             parser: AParser instance containing schema description of parsing output.
         """
 
-        if not self._use_schema:
-            return
-
         if "$defs" not in self._schema:
             self._schema["$defs"] = {"node": {"properties": {"anyOf": []}}}
         elif not isinstance(self._schema["$defs"], dict):
@@ -234,6 +265,8 @@ class Formatter:
         pid = parser.name
         p_ref = parser.get_reference()
         self._schema["$defs"][pid] = parser.schema
+        self._interpreted_schema = None
+        self._exported_schema = None
 
         if "node" not in self._schema["$defs"]:
             self._schema["$defs"].update({"node": {"properties": {"anyOf": []}}})
@@ -251,15 +284,17 @@ class Formatter:
             parser: AParser instance.
         """
 
-        if parser in self.parsers:
+        pid = parser.name
+        if pid in self._parsers_by_name:
             raise RuntimeError("Parser is already in Formatter.")
 
-        pid = parser.name
         self._cache.add(pid)
         self._indexes.set_index(pid, "prs", len(self._parsers))
         self._parsers.append(parser)
+        self._parsers_by_name[pid] = parser
         self._indexes.set_index(pid, "ifp", len(self._input_file_patterns))
         self._input_file_patterns.append(parser.input_file_pattern)
+        self._prepared_patterns.append(_prepare_pattern(parser.input_file_pattern))
 
         if self._use_schema:
             self._extend_json_schema(parser)
@@ -276,13 +311,16 @@ class Formatter:
             parser: AParser instance.
         """
 
-        if parser not in self._parsers:
+        pid = parser.name
+        if pid not in self._parsers_by_name:
             raise RuntimeError("Unknown Parser.")
 
-        pid = parser.name
         self._schema["$defs"][pid] = parser.schema
+        self._interpreted_schema = None
+        self._exported_schema = None
         ifp_index = self._indexes.get_index(pid, "ifp")
         self._input_file_patterns[ifp_index] = parser.input_file_pattern
+        self._prepared_patterns[ifp_index] = _prepare_pattern(parser.input_file_pattern)
 
         if self._use_schema:
             scp_index = self._indexes.get_index(pid, "scp")
@@ -297,17 +335,21 @@ class Formatter:
         Arguments:
             parser: AParser instance.
         """
-        if parser not in self._parsers:
+        pid = parser.name
+        if pid not in self._parsers_by_name:
             raise RuntimeError("Unknown Parser.")
 
-        pid = parser.name
         indexes = self._indexes.drop_indexes(pid)
-        self._parsers.pop(indexes["prs"], None)
-        self._input_file_patterns.pop(indexes["ifp"], None)
+        self._parsers.pop(indexes["prs"])
+        del self._parsers_by_name[pid]
+        self._input_file_patterns.pop(indexes["ifp"])
+        self._prepared_patterns.pop(indexes["ifp"])
 
         if self._use_schema:
-            self._schema["$defs"]["node"]["properties"]["anyOf"].pop(indexes["scp"], None)
+            self._schema["$defs"]["node"]["properties"]["anyOf"].pop(indexes["scp"])
             self._schema["$defs"].pop(pid, None)
+            self._interpreted_schema = None
+            self._exported_schema = None
 
         self._cache.drop(pid)
         parser.remove_formatter(self)
@@ -324,9 +366,9 @@ class Formatter:
                 Parser instance and corresponding internal ParserCache.
         """
 
-        for ex in self.parsers:
-            if ex.name == parser_name:
-                return ex, self._cache[parser_name]
+        parser = self._parsers_by_name.get(parser_name)
+        if parser is not None:
+            return parser, self._cache[parser_name]
         LOG.warning("No Parser with name '%s' exist", parser_name)
         return None, None
 
@@ -350,139 +392,252 @@ class Formatter:
 
         LOG.info("Parsing files ...")
 
-        to_parse = {}
         meta_files = []
-        for parser in self._parsers:
-            pid = parser.name
-            to_parse[pid] = []
-            LOG.debug("    preparing parser '%s'", pid)
-            for fp in file_paths:
-                pattern = parser.input_file_pattern.split("/")
-                pattern.reverse()
-                if pattern_parts_match(pattern, list(reversed(fp.parts))):
-                    to_parse[pid].append(fp)
-
-        for pid, sorted_paths in to_parse.items():
-            for file_path in sorted_paths:
-                LOG.debug("    parsing file '%s'", str(file_path))
-                # Get parser and parse metadata
-                pix = self._indexes.get_index(pid, "prs")
-                parser = self._parsers[pix]
-                metadata = parser.run_parser(file_path)
-
-                if not self.config["lazy_load"]:
-                    self._cache[pid].add(explored_path, file_path, metadata)
-                else:
-                    entry = self._cache[pid].add(explored_path, file_path)
-                    entry.save_metadata(
-                        metadata,
-                        overwrite=self.config.get("overwrite", True),
-                    )
-                    meta_files.append(entry.meta_path)
+        pending_saves = []
+        # Parsers are bucketed by file name pattern, such that each distinct file name pattern is matched once per file,
+        # parsers with literal file name patterns are directly looked up by file name.
+        # Bucket entries keep parser position to preserve parser order when combining buckets.
+        literal_buckets = {}
+        pattern_buckets = {}
+        for position, parser in enumerate(self._parsers):
+            reversed_pattern, name_pattern, literal_name = self._prepared_patterns[
+                self._indexes.get_index(parser.name, "ifp")
+            ]
+            if literal_name is not None:
+                bucket = literal_buckets.setdefault(literal_name, [])
+            else:
+                bucket = pattern_buckets.setdefault(name_pattern.pattern, (name_pattern, []))[1]
+            bucket.append((position, parser, reversed_pattern))
+        pattern_buckets = list(pattern_buckets.values())
+
+        # Single pass over files, each file is paired with all parsers whose pattern matches
+        to_parse = []
+        for file_path in file_paths:
+            reversed_parts = file_path.parts[::-1]
+            candidates = literal_buckets.get(reversed_parts[0], [])
+            for name_pattern, bucket in pattern_buckets:
+                if name_pattern.fullmatch(reversed_parts[0]) is not None:
+                    candidates = candidates + bucket
+            if len(candidates) > 1:
+                candidates = sorted(candidates, key=itemgetter(0))
+            # File name matched, remaining pattern parts are matched
+            for _, parser, reversed_pattern in candidates:
+                if pattern_parts_match(reversed_pattern, reversed_parts):
+                    to_parse.append((parser, file_path))
+
+        # If multiple parsing workers are requested, parsing is distributed over a process pool.
+        # Files are sent to workers in chunks, such that a Parser is pickled once per chunk instead of once per file.
+        # Results are consumed in submission order such that caching order is independent of the number of workers.
+        parsing_workers = self.config.get("parsing_workers", 1)
+        if parsing_workers > 1 and len(to_parse) > 1:
+            chunksize = -(-len(to_parse) // (parsing_workers * _CHUNKS_PER_WORKER))
+            with ProcessPoolExecutor(max_workers=parsing_workers) as executor:
+                results = executor.map(_run_parser, to_parse, chunksize=chunksize)
+                for (parser, file_path), metadata in zip(to_parse, results):
+                    LOG.debug("    parsed file '%s' with parser '%s'", file_path, parser.name)
+                    self._cache_metadata(parser.name, explored_path, file_path, metadata, pending_saves, meta_files)
+        else:
+            for parser, file_path in to_parse:
+                LOG.debug("    parsing file '%s' with parser '%s'", file_path, parser.name)
+                self._cache_metadata(
+                    parser.name, explored_path, file_path, parser.run_parser(file_path), pending_saves, meta_files
+                )
+
+        # Save remaining lazy loading results
+        if len(pending_saves) > 0:
+            self._save_metadata_batch(explored_path, pending_saves, meta_files)
 
         LOG.info("Done!")
 
         return meta_files
 
-    def _update_metadata_tree_with_schema(
-        self, interpreted_schema: helpers.SchemaEntry, branch: Optional[list] = None
-    ) -> dict:
+    def _cache_metadata(
+        self,
+        parser_name: str,
+        explored_path: Path,
+        file_path: Path,
+        metadata: dict,
+        pending_saves: List[Tuple[str, helpers.CacheEntry, dict]],
+        meta_files: List[Path],
+    ) -> None:
+        """
+        Stores parsing result in corresponding ParserCache.
+        If lazy loading is enabled, parsing result is queued to be saved to the meta file of the Parser,
+        queued results are saved together once the batch size is reached.
+
+        Arguments:
+            parser_name: name string of Parser which produced the parsing result.
+            explored_path: Path object pointing to root exploration target.
+            file_path: Path object pointing to parsed file.
+            metadata: dictionary of parsed metadata.
+            pending_saves: list of Parser name, CacheEntry, and parsing result triplets waiting to be saved to update.
+            meta_files: list of lazy load cache file Paths to update.
         """
-        Recursively generate metadata file using interpreted_schema obtained with SchemaInterpreter.
+
+        if not self.config["lazy_load"]:
+            self._cache[parser_name].add(explored_path, file_path, metadata)
+        else:
+            entry = self._cache[parser_name].add(explored_path, file_path)
+            pending_saves.append((parser_name, entry, metadata))
+            if len(pending_saves) >= _SAVE_BATCH_SIZE:
+                self._save_metadata_batch(explored_path, pending_saves, meta_files)
+
+    def _save_metadata_batch(
+        self, explored_path: Path, pending_saves: List[Tuple[str, helpers.CacheEntry, dict]], meta_files: List[Path]
+    ) -> None:
+        """
+        Saves batch of parsing results to cache files.
+        Parsing results of a Parser are appended to a single meta file in the root exploration target,
+        such that a file is created per Parser instead of per parsed file (cf. _meta_file_name).
+
+        Arguments:
+            explored_path: Path object pointing to root exploration target.
+            pending_saves: list of Parser name, CacheEntry, and parsing result triplets to save, emptied after saving.
+            meta_files: list of lazy load cache file Paths to update.
+        """
+
+        parser_saves = {}
+        for parser_name, entry, metadata in pending_saves:
+            parser_saves.setdefault(parser_name, []).append((entry, entry.dump_metadata(metadata)))
+
+        overwrite = self.config.get("overwrite", True)
+        for parser_name, saves in parser_saves.items():
+            meta_path = explored_path / _meta_file_name(parser_name)
+            self._cache[parser_name].save_metadata(saves, meta_path, overwrite)
+            if meta_path not in meta_files:
+                meta_files.append(meta_path)
+
+        pending_saves.clear()
+
+    def _update_metadata_tree_with_schema(self, interpreted_schema: helpers.SchemaEntry) -> dict:
+        """
+        Generate metadata file using interpreted_schema obtained with SchemaInterpreter.
         Designed to mimic structure of interpreted_schema where each SchemaEntry is a branching node in the metadata
         and whenever an parsing context is found the branch terminates.
         Handles additional context like parsing directives (!parsing) and directory directives (!varname).
 
-        While recursing over the tree branches, the branch path i.e. all the parent nodes are tracked in order
+        The interpreted schema is walked depth first using a stack of SchemaEntries instead of recursion,
+        metadata tree of a SchemaEntry is integrated into the metadata tree of its parent once all its items are processed.
+
+        While walking over the tree branches, the branch path i.e. all the parent nodes are tracked in order
         to use patternProperties without path directives.
 
         Arguments:
             interpreted_schema: dictionary containing interpreted schema obtained from SchemaInterpreter.
-            branch: Optional, list containing current recursion branch key.
 
         Returns:
             structured metadata obtained from parsing results
         """
 
-        tree = {}
-        context = interpreted_schema.context
-        if branch is None:
-            branch = []
-
-        # For all the entries in the interpreted schema
-        for key, value in interpreted_schema.items():
-
-            # Only process SchemaEntries
-            if isinstance(value, helpers.SchemaEntry):
-
-                branch.append(key)
-
-                # Update position in branch
-
-                # If current context contains regex information (children always inherit context)
-                # We merge all recursion results from children and return the resulting merge
-                if "useRegex" in context:
-                    tree = merge_dicts(tree, self._update_metadata_tree_with_schema(value, branch))
-
-                # If current context does not contain regex information but child context does,
-                # we need to integrate the recursion result into the metadata tree.
-                # However the recursion result will contain all the nodes in the branch up to
-                # the root of the tree i.e. if we are not currently at the root there will be
-                # a merging conflict. For this we loop over the tree nodes stored in the branch
-                # until we reach the current node and at that point we integrate into the tree.
-                elif "useRegex" in value.context:
-                    recursion_result = self._update_metadata_tree_with_schema(value, branch)
-                    # For each tree node in the current branch
-                    for node in branch:
-
-                        # Check the length of the recursion result and and existence of node
-                        if len(recursion_result) > 1 or node not in recursion_result:
-                            LOG.debug(
-                                "current metadata tree = %s\nrecursion results = %s",
-                                dumps(tree, indent=4, default=vars),
-                                dumps(recursion_result, indent=4, default=vars),
-                            )
-                            raise RuntimeError("Malformed recursion result when processing regex context")
-
-                        # If the current node is equal to the key in the interpreted schema i.e. last iteration of loop
-                        if key == node:
-                            # Add recursion result to tree
-                            tree[key] = recursion_result[key]
-                            # With break loop won't exit into else clause
-                            break
-
-                        # Otherwise we move in depth with the next node of the recursion result
-                        recursion_result = recursion_result[node]
-
-                    # If the break is never reached an error has ocurred
-                    else:
+        config = self.config
+
+        branch = []
+        # Each stack frame contains a SchemaEntry, an iterator over its items, and its metadata tree
+        stack = [[interpreted_schema, iter(interpreted_schema.items()), {}]]
+        while True:
+            frame = stack[-1]
+            entry = frame[0]
+            item = next(frame[1], None)
+
+            # All entries processed, integrate metadata tree into parent metadata tree
+            if item is None:
+                stack.pop()
+                if len(stack) == 0:
+                    return frame[2]
+
+                self._integrate_branch_result(stack[-1], entry, frame[2], branch)
+                branch.pop()
+
+            else:
+                key, value = item
+
+                # SchemaEntries are processed in depth before continuing with next items
+                if isinstance(value, helpers.SchemaEntry):
+                    # Update position in branch
+                    branch.append(key)
+                    stack.append([value, iter(value.items()), {}])
+
+                else:
+                    # Single lookup to both test and retrieve formatting rule
+                    rule = FORMATTING_RULES.get(key)
+
+                    # Nodes should not be of a different type than SchemaEntry
+                    if rule is None:
                         LOG.debug(
-                            "current metadata tree = %s\nrecursion results = %s",
-                            dumps(tree, indent=4, default=vars),
-                            dumps(recursion_result, indent=4, default=vars),
+                            "entry key '%s' , value type '%s' , expected type '%s'",
+                            key,
+                            str(type(value)),
+                            str(helpers.SchemaEntry),
                         )
-                        raise RuntimeError("Malformed metadata tree when processing regex context")
+                        raise TypeError("Unexpected value in interpreted schema.")
 
-                # Else we add a new entry to the tree using the recursion results
-                else:
-                    tree[key] = self._update_metadata_tree_with_schema(value, branch)
+                    # If entry corresponds to an parser reference
+                    frame[2] = rule(self, entry, branch, value, **config)
 
-                branch.pop()
+    def _integrate_branch_result(
+        self, parent_frame: list, value: helpers.SchemaEntry, branch_result: dict, branch: list
+    ) -> None:
+        """
+        Integrates metadata tree resulting from a SchemaEntry into the metadata tree of its parent.
+
+        Arguments:
+            parent_frame: stack frame of parent SchemaEntry, its metadata tree is updated in place.
+            value: SchemaEntry from which metadata tree resulted.
+            branch_result: metadata tree resulting from SchemaEntry.
+            branch: list containing current branch keys, last key being the one of the SchemaEntry.
+        """
+
+        context = parent_frame[0].context
+        tree = parent_frame[2]
+        key = branch[-1]
+
+        # If current context contains regex information (children always inherit context)
+        # We merge all results from children and return the resulting merge
+        if "useRegex" in context:
+            parent_frame[2] = merge_dicts(tree, branch_result)
+
+        # If current context does not contain regex information but child context does,
+        # we need to integrate the branch result into the metadata tree.
+        # However the branch result will contain all the nodes in the branch up to
+        # the root of the tree i.e. if we are not currently at the root there will be
+        # a merging conflict. For this we loop over the tree nodes stored in the branch
+        # until we reach the current node and at that point we integrate into the tree.
+        elif "useRegex" in value.context:
+            recursion_result = branch_result
+            # For each tree node in the current branch
+            for node in branch:
+
+                # Check the length of the recursion result and and existence of node
+                if len(recursion_result) > 1 or node not in recursion_result:
+                    LOG.debug(
+                        "current metadata tree = %s\nrecursion results = %s",
+                        LazyDumps(tree),
+                        LazyDumps(recursion_result),
+                    )
+                    raise RuntimeError("Malformed recursion result when processing regex context")
 
-            # If entry corresponds to an parser reference
-            elif key in FORMATTING_RULES:
-                tree = FORMATTING_RULES[key](self, interpreted_schema, branch, value, **deepcopy(self.config))
-            # Nodes should not be of a different type than SchemaEntry
+                # If the current node is equal to the key in the interpreted schema i.e. last iteration of loop
+                if key == node:
+                    # Add recursion result to tree
+                    tree[key] = recursion_result[key]
+                    # With break loop won't exit into else clause
+                    break
+
+                # Otherwise we move in depth with the next node of the recursion result
+                recursion_result = recursion_result[node]
+
+            # If the break is never reached an error has ocurred
             else:
                 LOG.debug(
-                    "entry key '%s' , value type '%s' , expected type '%s'",
-                    key,
-                    str(type(value)),
-                    str(helpers.SchemaEntry),
+                    "current metadata tree = %s\nrecursion results = %s",
+                    LazyDumps(tree),
+                    LazyDumps(recursion_result),
                 )
-                raise TypeError("Unexpected value in interpreted schema.")
+                raise RuntimeError("Malformed metadata tree when processing regex context")
 
-        return tree
+        # Else we add a new entry to the tree using the branch results
+        else:
+            tree[key] = branch_result
 
     def compile_metadata(self) -> dict:
         """
@@ -499,23 +654,85 @@ class Formatter:
 
         if self._use_schema:
             LOG.debug("    using schema structure ...")
-            self._interpreter = helpers.SchemaInterpreter(self.schema)
-            self.metadata = self._update_metadata_tree_with_schema(self._interpreter.generate())
+            # Schema is only interpreted again if modified since last compilation
+            if self._interpreted_schema is None:
+                self._interpreter = helpers.SchemaInterpreter(self.schema)
+                self._interpreted_schema = self._interpreter.generate()
+            self.metadata = self._update_metadata_tree_with_schema(self._interpreted_schema)
 
         else:
             LOG.debug("    using file path structure ...")
             for parser_cache in self._cache:
-                for cache_entry in parser_cache:
+                for cache_entry, metadata in zip(parser_cache, parser_cache.load_metadata()):
                     update_dict_with_parts(
                         self.metadata,
-                        cache_entry.load_metadata(),
-                        list(cache_entry.rel_path.parts),
+                        metadata,
+                        cache_entry.rel_parts,
                     )
         LOG.info("Done!")
 
         return self.metadata
 
 
+def _run_parser(parse_job: Tuple[AParser, Path]) -> dict:
+    """
+    Runs Parser on file, used to parse files in worker processes.
+
+    Arguments:
+        parse_job: Parser and Path object pointing to file to parse pair.
+
+    Returns:
+        dictionary of parsed metadata.
+    """
+
+    parser, file_path = parse_job
+    return parser.run_parser(file_path)
+
+
+def _meta_file_name(parser_name: str) -> str:
+    """
+    Generates name of meta file storing lazily loaded parsing results of a Parser.
+    Parser names are not restricted, hence characters other than alphanumerics, dots, underscores, and hyphens
+    are replaced and the name is shortened, such that the meta file is always located in the root exploration target.
+    A digest of the Parser name keeps names distinct after replacement.
+
+    Arguments:
+        parser_name: name string of Parser.
+
+    Returns:
+        file name string of meta file.
+    """
+
+    safe_name = _UNSAFE_FILE_NAME_CHARACTER.sub("_", parser_name)[:_MAX_SAFE_NAME_LENGTH]
+    digest = blake2b(parser_name.encode("utf-8"), digest_size=8).hexdigest()
+
+    return f"{safe_name}.{digest}.meta.pkl"
+
+
+def _prepare_pattern(input_file_pattern: str) -> Tuple[Tuple[str, ...], Pattern, Optional[str]]:
+    """
+    Prepares input file pattern for matching against file paths.
+
+    Arguments:
+        input_file_pattern: string of input file pattern.
+
+    Returns:
+        triplet containing:
+            0. tuple of pattern parts in reverse order, as expected by pattern_parts_match.
+            1. compiled pattern of file name part.
+            2. file name matched by file name part if it is a literal (e.g. "time\\.txt"), None otherwise.
+    """
+
+    reversed_pattern = tuple(input_file_pattern.split("/")[::-1])
+    name_part = reversed_pattern[0]
+
+    literal_name = None
+    if _LITERAL_PATTERN.fullmatch(name_part) is not None:
+        literal_name = _ESCAPED_CHARACTER.sub(r"\1", name_part)
+
+    return reversed_pattern, re_compile(name_part), literal_name
+
+
 # Class level method to register formatting rules
 Formatter.register_formatting_rule = register_formatting_rule
 
@@ -547,26 +764,33 @@ def _combine(
     """
 
     if config is None:
-        # Test reference
-        if formatter1.config != formatter2.config:
-            for key, value in formatter1.config:
+        # Test reference, shared configuration needs no content comparison
+        if formatter1.config is not formatter2.config:
+            if len(formatter1.config) != len(formatter2.config):
+                LOG.debug(
+                    "formatter1.config = %s\nformatter2.config = %s",
+                    LazyDumps(formatter1.config),
+                    LazyDumps(formatter2.config),
+                )
+                raise KeyError("key mismatch in Formatter.combine.")
+            for key, value in formatter1.config.items():
                 if key not in formatter2.config:
                     LOG.debug(
                         "formatter1.config = %s\nformatter2.config = %s",
-                        dumps(formatter1.config, indent=4, default=vars),
-                        dumps(formatter2.config, indent=4, default=vars),
+                        LazyDumps(formatter1.config),
+                        LazyDumps(formatter2.config),
                     )
                     raise KeyError("key mismatch in Formatter.combine.")
                 if value != formatter2.config[key]:
                     LOG.debug(
                         "formatter1.config = %s\nformatter2.config = %s",
-                        dumps(formatter1.config, indent=4, default=vars),
-                        dumps(formatter2.config, indent=4, default=vars),
+                        LazyDumps(formatter1.config),
+                        LazyDumps(formatter2.config),
                     )
                     raise ValueError("Value mismatch in Formatter.combine.")
 
             # If different reference but same content then copy content to new config
-            config = deepcopy(formatter1.config)
+            config = formatter1.config.copy()
 
         else:
             # If same reference then keep reference
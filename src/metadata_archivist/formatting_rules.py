@@ -31,17 +31,24 @@ Authors: Jose V., Matthias K.
 
 import logging
 
-from json import dumps
+from re import compile as re_compile, Match
+from numbers import Number
+from functools import lru_cache
+from ast import AST, BinOp, Name, Constant, Add, Sub, Mult, Div, Mod, parse as ast_parse, literal_eval
+from operator import add, sub, mul, truediv, mod
 from typing import Callable
-from typing import Union, TYPE_CHECKING
+from typing import Union, Tuple, TYPE_CHECKING
 
 from metadata_archivist.helper_classes import SchemaEntry
 from metadata_archivist.helper_functions import (
     pattern_parts_match,
+    compile_pattern_parts,
     update_dict_with_parts,
+    nested_dict_with_parts,
     unpack_nested_value,
     filter_metadata,
     add_info_from_schema,
+    LazyDumps,
 )
 
 if TYPE_CHECKING:
@@ -50,6 +57,15 @@ if TYPE_CHECKING:
 
 LOG = logging.getLogger(__name__)
 
+# Variable placeholder in !calculate expressions
+_VARIABLE_PLACEHOLDER = re_compile(r"\{(\w+)\}")
+
+# Positional identifiers replacing variable placeholders in !calculate expressions
+_POSITIONAL_IDENTIFIER = re_compile(r"_\d+")
+
+# Arithmetic operators allowed in !calculate expressions
+_BINARY_OPERATORS = {Add: add, Sub: sub, Mult: mul, Div: truediv, Mod: mod}
+
 
 def _format_parser_id_rule(
     formatter: "Formatter",
@@ -64,144 +80,167 @@ def _format_parser_id_rule(
     # Further value filtering can be done through key selection in !parsing directive.
 
     if not isinstance(value, str):
-        LOG.debug("value type '%s' , expected type '%s'", str(type(value)), str(str))
+        LOG.debug("value type '%s' , expected type '%s'", type(value), str)
         raise TypeError("Incorrect value type for formatting parser id.")
 
     # Currently only one parser reference per entry is allowed
     # and if a reference exists it must be the only content in the entry
-    if len(interpreted_schema.items()) > 1:
+    if len(interpreted_schema) > 1:
         LOG.debug(
             "schema entry key '%s'\nschema entry content = %s",
             interpreted_schema.key,
-            dumps(interpreted_schema, indent=4, default=vars),
+            LazyDumps(interpreted_schema),
         )
         raise RuntimeError("Invalid SchemaEntry content.")
 
     # Get parser and its cache
     parser, parser_cache = formatter.get_parser(value)
 
-    # Parser may have processed multiple files
-    parsed_metadata = None
-
-    # For all cache entries
-    for cache_entry in parser_cache:
-
-        # If in a regex context match file path to branch position
-        if "useRegex" in interpreted_schema.context:
+    # Parsing directives are looked up once, missing (or null) directives are None
+    context = interpreted_schema.context
+    parsing_context = context.get("!parsing")
+    if parsing_context is not None:
+        parsing_path = parsing_context.get("path")
+        parsing_keys = parsing_context.get("keys")
+        parsing_unpack = parsing_context.get("unpack")
+    else:
+        parsing_path = parsing_keys = parsing_unpack = None
+
+    # Everything not depending on cache entries is computed once before looping over them
+    use_regex = "useRegex" in context
+    # Patterns are compiled once, path patterns have their !varname instructions resolved with context.
+    # Branch is reversed while skipping its last element, as it represents the node name of the parsed metadata
+    # not to be included in the path of the tree
+    reversed_branch = compile_pattern_parts(branch[-2::-1]) if use_regex else None
+    regex_path = compile_pattern_parts(parsing_path.split("/")[::-1], context) if parsing_path is not None else None
+    add_description = kwargs.get("add_description", False)
+    add_type = kwargs.get("add_type", False)
+    annotate = add_description or add_type
+
+    # Parser may have processed multiple files, if none then there is no metadata
+    if parser_cache.is_empty():
+        return None
+
+    # In a regex or path context, parsed metadata is structured in a dictionary
+    # where keys are filenames and values are metadata.
+    # Otherwise parsed metadata is structured in a list and metadata is appended to it
+    use_dict = use_regex or regex_path is not None
+
+    # Cache entries are matched against branch and path first, only matching entries are then loaded and formatted
+    if use_dict:
+        matching_entries = []
+
+        # Branch matching only depends on parent directory of cache entries,
+        # match results are kept per directory such that files in a same directory are matched once
+        directory_matches = {}
+
+        for cache_entry in parser_cache:
+
+            # If in a regex context match file path to branch position,
+            # if there is a mismatch we skip the cache entry
+            if use_regex:
+                directory_parts = cache_entry.rel_parts[:-1]
+                is_match = directory_matches.get(directory_parts)
+                if is_match is None:
+                    # Reversed directory parts are the reversed file parts without the file name
+                    is_match = pattern_parts_match(reversed_branch, cache_entry.rev_parts[1:])
+                    directory_matches[directory_parts] = is_match
+                if not is_match:
+                    continue
+
+            # If path information is present in parser directives match file path to given regex path,
+            # in this case the name of the file should be taken into account in the context path.
+            # If the match is negative then we skip the current cache entry
+            if regex_path is not None and not pattern_parts_match(regex_path, cache_entry.rev_parts):
+                continue
 
-            # Parsed metadata should be structured in a dictionary
-            # where keys are filenames and values are metadata
-            if parsed_metadata is None:
-                parsed_metadata = {}
-            elif not isinstance(parsed_metadata, dict):
+            matching_entries.append(cache_entry)
+    else:
+        matching_entries = list(parser_cache)
+
+    # Common case without any matching, filtering, annotation, or unpacking, parsing results are collected as is
+    if not use_dict and parsing_keys is None and parsing_unpack is None and not annotate:
+        parsed_metadata = parser_cache.load_metadata(matching_entries)
+        return parsed_metadata[0] if len(parsed_metadata) == 1 else parsed_metadata
+
+    # Unpacking directive is validated once, True unpacks until a primitive is found and integers give unpacking level
+    unpack_level = None
+    if parsing_unpack is not None:
+        if isinstance(parsing_unpack, bool):
+            if not parsing_unpack:
                 LOG.debug(
-                    "parsed metadata = %s\ncontext = %s",
-                    dumps(parsed_metadata, indent=4, default=vars),
-                    dumps(interpreted_schema.context, indent=4, default=vars),
+                    "parsing context = %s",
+                    LazyDumps(parsing_context),
                 )
-                raise TypeError("Incorrect parsed_metadata type.")
-
-            # We skip the last element as it represents the node name of the parsed metadata
-            # not to be included in the path of the tree
-            file_path_parts = list(reversed(cache_entry.rel_path.parent.parts))
-            reversed_branch = list(reversed(branch[: len(branch) - 1]))
-
-            # If there is a mismatch we skip the cache entry
-            if not pattern_parts_match(reversed_branch, file_path_parts):
-                continue
+                raise ValueError("Incorrect unpacking configuration in !parsing context: unpack=False.")
 
-        parsing_context = interpreted_schema.context["!parsing"] if "!parsing" in interpreted_schema.context else None
-
-        # If path information is present in parser directives match file path to given regex path
-        if parsing_context is not None and "path" in parsing_context:
-
-            # Parsed metadata should be structured in a dictionary
-            # where keys are filenames and values are metadata
-            if parsed_metadata is None:
-                parsed_metadata = {}
-            elif not isinstance(parsed_metadata, dict):
+        elif isinstance(parsing_unpack, int):
+            if parsing_unpack == 0:
                 LOG.debug(
-                    "parsed metadata = %s\ncontext = %s",
-                    dumps(parsed_metadata, indent=4, default=vars),
-                    dumps(interpreted_schema.context, indent=4, default=vars),
+                    "parsing context = %s",
+                    LazyDumps(parsing_context),
                 )
-                raise TypeError("Incorrect parsed_metadata type.")
+                raise ValueError("Incorrect unpacking configuration in !parsing context: unpack=0.")
 
-            # In this case the name of the file should be taken into account in the context path
-            file_path_parts = list(reversed(cache_entry.rel_path.parts))
-            regex_path = parsing_context["path"].split("/")
-            regex_path.reverse()
+            unpack_level = parsing_unpack
+        else:
+            LOG.debug(
+                "Unpack type '%s', expected types '%s' or '%s'",
+                type(parsing_unpack),
+                bool,
+                int,
+            )
+            raise TypeError("Incorrect unpacking configuration in !parsing context.")
 
-            # If the match is negative then we skip the current cache entry
-            if not pattern_parts_match(regex_path, file_path_parts, interpreted_schema.context):
-                continue
+    parsed_metadata = {} if use_dict else []
+    # Bound once as called for each cache entry
+    append_metadata = parsed_metadata.append if not use_dict else None
 
-        # If not in a regex/path context then parsed metadata is structured
-        # in a list and metadata is appended to it
-        if parsed_metadata is None:
-            parsed_metadata = []
+    # Parsed metadata dictionary nested at parent directory of last stored cache entry, and its key.
+    # Consecutive cache entries from a same directory reuse it instead of descending from the root again.
+    cursor_directory = None
+    cursor_dict = None
+    cursor_key = None
 
-        # Lazy loading handling
-        metadata = cache_entry.load_metadata()
+    # For all matching cache entries, lazily stored metadata is loaded at once for all of them
+    for cache_entry, metadata in zip(matching_entries, parser_cache.load_metadata(matching_entries)):
 
         # Compute additional directives if given
-        if parsing_context is not None and "keys" in parsing_context:
+        if parsing_keys is not None:
             metadata = filter_metadata(
                 metadata,
-                parsing_context["keys"],
+                parsing_keys,
             )
 
-        add_description = kwargs.get("add_description", False)
-        add_type = kwargs.get("add_type", False)
-        add_info_from_schema(metadata, parser.schema, add_description, add_type)
+        # Annotation keys are relative to parser schema hence it is done per parsing result, before unpacking
+        if annotate:
+            add_info_from_schema(metadata, parser.schema, add_description, add_type)
 
         # Unpacking should only be done for singular nested values i.e. only one key per nesting level
-        if parsing_context is not None and "unpack" in parsing_context:
-            unpack = parsing_context["unpack"]
-            if isinstance(unpack, bool):
-                if not unpack:
-                    LOG.debug(
-                        "parsing context = %s",
-                        dumps(parsing_context, indent=4, default=vars),
-                    )
-                    raise ValueError("Incorrect unpacking configuration in !parsing context: unpack=False.")
-
-                metadata = unpack_nested_value(metadata)
-
-            elif isinstance(unpack, int):
-                if unpack == 0:
-                    LOG.debug(
-                        "parsing context = %s",
-                        dumps(parsing_context, indent=4, default=vars),
-                    )
-                    raise ValueError("Incorrect unpacking configuration in !parsing context: unpack=0.")
-
-                metadata = unpack_nested_value(metadata, unpack)
-            else:
-                LOG.debug(
-                    "Unpack type '%s', expected types '%s' or '%s'",
-                    str(type(unpack)),
-                    str(bool),
-                    str(int),
-                )
-                raise TypeError("Incorrect unpacking configuration in !parsing context.")
+        if parsing_unpack is not None:
+            metadata = unpack_nested_value(metadata, unpack_level)
 
         # Update parsed metadata
         # When in a regex context then resulting parsed metadata is a dict
-        if isinstance(parsed_metadata, dict):
+        if use_dict:
 
             # When updating the parsed metadata dict,
             # the relative path to cache entry is used,
             # however the filename is changed to the name of key of the interpreted_schema key.
-            relative_path = cache_entry.rel_path.parent / interpreted_schema.key
-            update_dict_with_parts(parsed_metadata, metadata, list(relative_path.parts))
+            directory_parts = cache_entry.rel_parts[:-1]
+            if directory_parts != cursor_directory:
+                relative_parts = (cache_entry.rel_path.parent / interpreted_schema.key).parts
+                cursor_dict = nested_dict_with_parts(parsed_metadata, relative_parts[:-1])
+                cursor_key = relative_parts[-1]
+                cursor_directory = directory_parts
+            cursor_dict[cursor_key] = metadata
 
         # Else by default we append to a list
         else:
-            parsed_metadata.append(metadata)
+            append_metadata(metadata)
 
     # Update tree according to metadata retrieved
-    if isinstance(parsed_metadata, list):
+    if not use_dict:
         tree = parsed_metadata[0] if len(parsed_metadata) == 1 else parsed_metadata
     else:
         tree = parsed_metadata
@@ -221,11 +260,11 @@ def _format_calculate_rule(
     # At this point variable, count and names have been verified by Interpreter.
 
     if not isinstance(value, dict):
-        LOG.debug("value type '%s' , expected type '%s'", str(type(value)), str(dict))
+        LOG.debug("value type '%s' , expected type '%s'", type(value), dict)
         raise TypeError("Incorrect value type found while formatting calculation")
 
     if not all(key in value for key in ["expression", "variables"]):
-        LOG.debug("!calculate directive value = %s", dumps(value, indent=4, default=vars))
+        LOG.debug("!calculate directive value = %s", LazyDumps(value))
         raise RuntimeError("Malformed !calculate entry found while formatting calculation.")
 
     add_description = kwargs.pop("add_description", False)
@@ -240,22 +279,20 @@ def _format_calculate_rule(
         if not isinstance(entry, SchemaEntry):
             LOG.debug(
                 "entry type '%s' , expected type '%s'",
-                str(type(entry)),
-                str(SchemaEntry),
+                type(entry),
+                SchemaEntry,
             )
             raise TypeError("Incorrect variable type found while formatting calculation.")
-        if not len(entry.items()) == 1:
-            LOG.debug("entry content = %s", dumps(entry, indent=4, default=vars))
+        if len(entry) != 1:
+            LOG.debug("entry content = %s", LazyDumps(entry))
             raise ValueError("Incorrect variable entry found while formatting calculation.")
 
         parsing_values[variable] = _format_parser_id_rule(formatter, entry, branch, entry["!parser_id"], **kwargs)
 
-    formatted_expression = expression.format(**parsing_values)
-    result = eval(
-        formatted_expression,
-        {"__builtins__": None},
-        {},
-    )
+    # Expression is parsed once and evaluated directly on its syntax tree,
+    # parsing results are used as values of expression variables
+    expression_tree, expression_variables = _compile_expression(expression)
+    result = _evaluate_expression(expression_tree, [parsing_values[variable] for variable in expression_variables])
 
     if add_description or add_type:
         # In calculate directive description or type are retrieved from formatting schema.
@@ -269,6 +306,64 @@ def _format_calculate_rule(
     return result
 
 
+@lru_cache(maxsize=256)
+def _compile_expression(expression: str) -> Tuple[AST, Tuple[str, ...]]:
+    # Parses !calculate expression into a syntax tree.
+    # Variable placeholders are replaced by positional identifiers (e.g. {val1} -> _0),
+    # such that variable names need not be valid Python identifiers.
+    # Returns syntax tree of expression and tuple of variable names in order of positional identifiers.
+
+    variables = []
+
+    def to_identifier(match: Match) -> str:
+        if match.group(1) not in variables:
+            variables.append(match.group(1))
+        return f"_{variables.index(match.group(1))}"
+
+    source = _VARIABLE_PLACEHOLDER.sub(to_identifier, expression)
+    try:
+        tree = ast_parse(source, mode="eval").body
+    except SyntaxError as e:
+        LOG.debug("Expression '%s'", expression)
+        raise ValueError("Incorrect expression found while formatting calculation.") from e
+
+    return tree, tuple(variables)
+
+
+def _evaluate_expression(node: AST, values: list) -> Union[int, float]:
+    # Evaluates syntax tree of !calculate expression.
+    # Only numerical constants, positional identifiers of variables, and basic arithmetic operations are allowed,
+    # which is what expressions are validated against when interpreting the schema.
+    # Variable values can be of any numerical type except booleans,
+    # string values of variables are evaluated as numerical literals.
+
+    if isinstance(node, BinOp):
+        operation = _BINARY_OPERATORS.get(type(node.op))
+        if operation is None:
+            LOG.debug("Expression operator '%s'", type(node.op).__name__)
+            raise ValueError("Unsupported operator found while formatting calculation.")
+        return operation(_evaluate_expression(node.left, values), _evaluate_expression(node.right, values))
+
+    if isinstance(node, Name) and _POSITIONAL_IDENTIFIER.fullmatch(node.id) and int(node.id[1:]) < len(values):
+        value = values[int(node.id[1:])]
+        if isinstance(value, str):
+            try:
+                value = literal_eval(value)
+            except (SyntaxError, ValueError) as e:
+                LOG.debug("Variable value '%s'", value)
+                raise ValueError("Non numerical variable value found while formatting calculation.") from e
+        if not isinstance(value, Number) or isinstance(value, bool):
+            LOG.debug("Variable value type '%s' , expected type '%s'", type(value), Number)
+            raise TypeError("Non numerical variable value found while formatting calculation.")
+        return value
+
+    if isinstance(node, Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return node.value
+
+    LOG.debug("Expression element '%s'", type(node).__name__)
+    raise ValueError("Unsupported element found while formatting calculation.")
+
+
 FORMATTING_RULES = {
     "!parser_id": _format_parser_id_rule,
     "!calculate": _format_calculate_rule,
@@ -18,15 +18,17 @@ Authors: Jose V., Matthias K.
 
 import logging
 
-from json import dumps
+from sys import intern
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import sha3_256
-from typing import Optional, Dict, Union, Any
-from collections.abc import Iterator, ItemsView
+from operator import attrgetter
+from typing import Optional, Dict, Union, List, Tuple, BinaryIO
+from collections.abc import Iterator
 from pickle import loads as p_loads, dumps as p_dumps, HIGHEST_PROTOCOL
 
 
-from metadata_archivist.helper_functions import merge_dicts, IGNORED_ITERABLE_KEYWORDS
+from metadata_archivist.helper_functions import merge_dicts, LazyDumps, json_loads, IGNORED_ITERABLE_KEYWORDS
 from metadata_archivist.interpretation_rules import (
     INTERPRETATION_RULES,
     register_interpretation_rule,
@@ -47,6 +49,8 @@ class CacheEntry:
         explored_path: Path object pointing to root exploration directory. Used to get relative file paths.
         file_path: Path object pointing to parsed file.
         rel_path: file Path relative to explored Path.
+        rel_parts: tuple of parts of relative file Path.
+        rev_parts: tuple of parts of relative file Path in reverse order, as expected by pattern_parts_match.
         metadata: parsed metadata dictionary.
 
     Methods:
@@ -68,10 +72,25 @@ class CacheEntry:
         self.explored_path = explored_path
         self.file_path = file_path
         self.rel_path = file_path.relative_to(explored_path)
+        # Parts are computed on each access of Path.parts, stored as used repeatedly when formatting
+        self.rel_parts = self.rel_path.parts
+        self.rev_parts = self.rel_parts[::-1]
         self.metadata = metadata
-        self.meta_path = Path(str(file_path) + ".meta.pkl")
+        # Meta file path is only needed with lazy loading, generated on first access
+        # unless set by ParserCache when storing metadata in a meta file shared by several entries
+        self._meta_path = None
+        # Position of serialized metadata in meta file, whole file by default
+        self._meta_offset = 0
+        self._meta_length = -1
         self._digest = None
 
+    @property
+    def meta_path(self) -> Path:
+        """Returns Path object pointing to lazy load cache file of parsed file."""
+        if self._meta_path is None:
+            self._meta_path = Path(str(self.file_path) + ".meta.pkl")
+        return self._meta_path
+
     def load_metadata(self) -> dict:
         """
         Loads cached metadata.
@@ -84,23 +103,34 @@ class CacheEntry:
 
         if self.metadata is None:
             if self._digest is None:
-                LOG.debug("CacheEntry = %s", dumps(self, indent=4, default=vars))
+                LOG.debug("CacheEntry = %s", LazyDumps(self))
                 raise RuntimeError("Metadata has not been cached yet.")
 
             with self.meta_path.open("rb", encoding=None) as f:
-                bytes_read = f.read()
-                new_digest = sha3_256(bytes_read).hexdigest()
-                if new_digest == self._digest:
-                    self.metadata = p_loads(bytes_read)
-                else:
-                    raise ValueError("Encoded pickle has been tampered with.")
+                self._read_metadata(f)
 
             if self.metadata is None:
-                LOG.debug("CacheEntry = %s", dumps(self, indent=4, default=vars))
+                LOG.debug("CacheEntry = %s", LazyDumps(self))
                 raise RuntimeError("Failed to load metadata from CacheEntry.")
 
         return self.metadata
 
+    def _read_metadata(self, f: BinaryIO) -> None:
+        """
+        Reads metadata from opened meta file at stored position and verifies its integrity.
+
+        Arguments:
+            f: meta file opened in binary read mode.
+        """
+
+        f.seek(self._meta_offset)
+        bytes_read = f.read(self._meta_length)
+        new_digest = sha3_256(bytes_read).hexdigest()
+        if new_digest == self._digest:
+            self.metadata = p_loads(bytes_read)
+        else:
+            raise ValueError("Encoded pickle has been tampered with.")
+
     def save_metadata(self, metadata: dict, overwrite: bool = True) -> None:
         """
         Saves metadata to file and releases object from memory.
@@ -120,14 +150,32 @@ class CacheEntry:
                 LOG.debug("Meta file path '%s'", str(self.meta_path))
                 raise FileExistsError("Unable to save parsed metadata; overwriting not allowed.")
 
-        pickle_dump = p_dumps(metadata, protocol=HIGHEST_PROTOCOL)
-        self._digest = sha3_256(pickle_dump).hexdigest()
+        pickle_dump = self.dump_metadata(metadata)
+        self._meta_offset = 0
+        self._meta_length = -1
 
         with self.meta_path.open("wb", encoding=None) as f:
             f.write(pickle_dump)
 
         del metadata
 
+    def dump_metadata(self, metadata: dict) -> bytes:
+        """
+        Serializes metadata to be saved to file.
+        Digest of serialization is kept to verify integrity when loading.
+
+        Arguments:
+            metadata: dictionary to serialize.
+
+        Returns:
+            pickled metadata bytes.
+        """
+
+        pickle_dump = p_dumps(metadata, protocol=HIGHEST_PROTOCOL)
+        self._digest = sha3_256(pickle_dump).hexdigest()
+
+        return pickle_dump
+
 
 class ParserCache:
     """
@@ -139,6 +187,8 @@ class ParserCache:
 
     Methods:
         add: add new CacheEntry for parsed file.
+        save_metadata: append serialized metadata of CacheEntries to shared meta file.
+        load_metadata: load metadata of CacheEntries, reading each meta file once.
         is_empty: empty test for internal list containing CacheEntries.
     """
 
@@ -146,6 +196,8 @@ class ParserCache:
         """Constructor for ParserCache"""
         self._entries = []
         self._iterator = None
+        # Meta file shared by lazily stored CacheEntries, created on first save
+        self._meta_path = None
 
     def add(self, *args) -> CacheEntry:
         """
@@ -160,6 +212,72 @@ class ParserCache:
         self._entries.append(entry)
         return entry
 
+    def save_metadata(self, saves: List[Tuple[CacheEntry, bytes]], meta_path: Path, overwrite: bool = True) -> None:
+        """
+        Appends serialized metadata of CacheEntries to a single meta file shared by CacheEntries.
+        Meta file is created on first save to given path, subsequent saves to same path append to it.
+        Each CacheEntry keeps position of its metadata in meta file for loading.
+
+        Arguments:
+            saves: list of CacheEntry and serialized metadata (cf. CacheEntry.dump_metadata) pairs.
+            meta_path: Path object pointing to shared meta file.
+            overwrite: control boolean to enable overwriting of existing meta file.
+        """
+
+        if meta_path != self._meta_path:
+            if meta_path.exists():
+                if overwrite:
+                    LOG.warning("Meta file %s exists, overwriting.", meta_path)
+                else:
+                    LOG.debug("Meta file path '%s'", meta_path)
+                    raise FileExistsError("Unable to save parsed metadata; overwriting not allowed.")
+            mode = "wb"
+            self._meta_path = meta_path
+        else:
+            mode = "ab"
+
+        with meta_path.open(mode) as f:
+            offset = f.tell()
+            for entry, pickle_dump in saves:
+                f.write(pickle_dump)
+                entry._meta_path = meta_path
+                entry._meta_offset = offset
+                entry._meta_length = len(pickle_dump)
+                offset += len(pickle_dump)
+
+    def load_metadata(self, entries: Optional[List[CacheEntry]] = None) -> List[dict]:
+        """
+        Loads metadata of CacheEntries, by default of all CacheEntries.
+        Lazily stored CacheEntries sharing a meta file are loaded in order of position with a single opening,
+        distinct meta files are loaded in separate threads.
+
+        Arguments:
+            entries: Optional. list of CacheEntries to load.
+
+        Returns:
+            list of parsed metadata dictionaries, in order of CacheEntries.
+        """
+
+        if entries is None:
+            entries = self._entries
+
+        # Only CacheEntries that have been saved but not loaded yet are read,
+        # errors for other CacheEntries are raised when calling their load_metadata method
+        pending = {}
+        for entry in entries:
+            if entry.metadata is None and entry._digest is not None:
+                pending.setdefault(entry.meta_path, []).append(entry)
+
+        if len(pending) > 1:
+            with ThreadPoolExecutor() as executor:
+                # Results are consumed to raise exceptions from threads
+                list(executor.map(_read_meta_file, pending.items()))
+        else:
+            for item in pending.items():
+                _read_meta_file(item)
+
+        return [entry.load_metadata() for entry in entries]
+
     def __getitem__(self, index: int) -> CacheEntry:
         """
         Get operator for internal list using index.
@@ -195,6 +313,21 @@ class ParserCache:
         return len(self._entries) == 0
 
 
+def _read_meta_file(item: Tuple[Path, List[CacheEntry]]) -> None:
+    """
+    Reads metadata of CacheEntries stored in a same meta file.
+
+    Arguments:
+        item: meta file Path and list of CacheEntries stored in it pair.
+    """
+
+    meta_path, entries = item
+    entries.sort(key=attrgetter("_meta_offset"))
+    with meta_path.open("rb", encoding=None) as f:
+        for entry in entries:
+            entry._read_metadata(f)
+
+
 class FormatterCache:
     """
     Convenience class for storing ParserCache objects.
@@ -359,27 +492,40 @@ class ParserIndexes:
     def drop_indexes(self, parser_name: str) -> dict:
         """
         Remove method for a Parser in all index storages.
+        As indexed items are removed from their lists, indexes stored after dropped ones are shifted accordingly.
 
         Arguments:
             parser_name: name string of Parser to use as identifier.
 
         Returns:
-            dictionary of storage names and index pairs corresponding to Parser.
+            dictionary of storage names and index pairs corresponding to Parser,
+            index is None if not stored e.g. schema properties index when no schema is used.
         """
-        return {
-            "prs": self._prs_indexes.pop(parser_name),
-            "ifp": self._ifp_indexes.pop(parser_name),
-            "scp": self._scp_indexes.pop(parser_name),
-        }
 
+        indexes = {}
+        for storage_name, storage in (
+            ("prs", self._prs_indexes),
+            ("ifp", self._ifp_indexes),
+            ("scp", self._scp_indexes),
+        ):
+            index = storage.pop(parser_name, None)
+            if index is not None:
+                for name, other_index in storage.items():
+                    if other_index > index:
+                        storage[name] = other_index - 1
+            indexes[storage_name] = index
+
+        return indexes
 
-class SchemaEntry:
+
+class SchemaEntry(dict):
     """
     Convenience superset of dictionary class.
     Container class for nested dictionary structure to serve as an intermediary between schema and metadata file.
     Contains additional context dictionary for a given tree level and the name of the root node.
     For initial root node, no name is defined, however for subsequent nodes there should always be a name.
-    Get, set, and iteration access is redirected to internal storage.
+    Entry content is stored directly in the underlying dictionary, hence get, set, and iteration access
+    use the built-in dictionary operations.
 
     Attributes:
         key: schema key used as entry name.
@@ -387,11 +533,11 @@ class SchemaEntry:
         context: dictionary containing information of schema properties where entry is created.
 
     Methods:
-        items: returns key value pair item view of entry content.
-        is_empty: returns True is entry content is empty.
         inherit: returns a new instance of SchemaEntry with extended attributes.
     """
 
+    __slots__ = ("key", "key_path", "context")
+
     def __init__(
         self,
         key: Optional[str] = None,
@@ -406,31 +552,10 @@ class SchemaEntry:
             context: dictionary containing information of schema properties where entry is created.
         """
 
+        super().__init__()
         self.key = key
         self.key_path = key_path if key_path is not None else []
         self.context = context if context is not None else {}
-        self._content = {}
-        self._iterator = None
-
-    def __getitem__(self, key: str) -> Any:
-        """Value retrieval method for entry content using key."""
-        return self._content[key]
-
-    def __setitem__(self, key: str, value: Any) -> None:
-        """Value insertion method for entry content using key."""
-        self._content[key] = value
-
-    def __contains__(self, key: str) -> bool:
-        """Key presence test for entry content."""
-        return key in self._content
-
-    def items(self) -> ItemsView[str, Any]:
-        """Entry content items get method."""
-        return self._content.items()
-
-    def is_empty(self) -> bool:
-        """Entry empty content test."""
-        return len(self._content) == 0
 
     def inherit(self, key: str, key_path: Optional[list], context: Optional[dict]) -> "SchemaEntry":
         """Instance inheritance function with attribute extension."""
@@ -453,32 +578,37 @@ class SchemaInterpreter:
     Attributes:
         schema: dictionary containing schema to interpret.
         structure: root SchemaEntry used for interpretation.
-        rules: dictionary of interpretation rules.
+        rules: dictionary of interpretation rules. Shared reference to INTERPRETATION_RULES, not a copy.
 
     Methods:
         generate: convenience method to generate schema interpretation.
     """
 
-    def __init__(self, schema: dict) -> None:
+    def __init__(self, schema: Union[dict, bytes, str]) -> None:
         """
         Constructor of SchemaInterpreter.
 
         Arguments:
             schema: dictionary containing schema to interpret.
+                    If bytes or string is provided, assumes JSON document containing dictionary.
         """
 
+        if isinstance(schema, (bytes, str)):
+            schema = json_loads(schema)
+
         if not isinstance(schema, dict):
             LOG.debug("schema type '%s' , expected type '%s'", str(type(schema)), str(dict))
             raise TypeError("Incorrect schema used for iterator.")
         if "properties" not in schema or not isinstance(schema["properties"], dict):
-            LOG.debug("schema = %s", dumps(schema, indent=4, default=vars))
+            LOG.debug("schema = %s", LazyDumps(schema))
             raise ValueError("Incorrect schema structure, root is expected to contain properties dictionary.")
         if "$defs" not in schema or not isinstance(schema["$defs"], dict):
-            LOG.debug("schema = %s", dumps(schema, indent=4, default=vars))
+            LOG.debug("schema = %s", LazyDumps(schema))
             raise ValueError("Incorrect schema structure, root is expected to contain $defs dictionary.")
 
         self.schema = schema
         self.structure = SchemaEntry()
+        self.rules = INTERPRETATION_RULES
 
     def interpret_schema(
         self,
@@ -526,23 +656,28 @@ class SchemaInterpreter:
         # For all the properties in the given schema
         for key, val in properties.items():
 
+            # Keys loaded from schema files are not interned, interning them allows
+            # identity matching against known keywords and rule names and
+            # the interned keys are reused in the generated SchemaEntries.
+            key = intern(key)
+
             # If key is a known ignored keyword
             if key in IGNORED_ITERABLE_KEYWORDS:
                 LOG.debug("Ignoring schema keyword '%s'", key)
 
             # If the key is known as an interpretation rule
             # call the function mapped into the INTERPRETATION_RULE dictionary
-            elif key in INTERPRETATION_RULES:
+            elif key in self.rules:
                 # This error is only raised if an interpretation rule is found at root of schema properties
                 # rules must be defined in individual items of the properties, hence a parent key should
                 # always be present.
                 if _parent_key is None:
                     LOG.debug(
                         "current structure = %s",
-                        dumps(_relative_root, indent=4, default=vars),
+                        LazyDumps(_relative_root),
                     )
                     raise RuntimeError("Cannot interpret rule without parent key.")
-                _relative_root = INTERPRETATION_RULES[key](self, val, key, _parent_key, _relative_root)
+                _relative_root = self.rules[key](self, val, key, _parent_key, _relative_root)
 
             else:
                 # Case dict i.e. branch
@@ -576,14 +711,18 @@ class SchemaInterpreter:
         Returns:
             self contained SchemaEntry
         """
-        LOG.debug("Initial structure = %s", dumps(self.schema, indent=4, default=vars))
 
-        if self.structure.is_empty():
-            self.structure = self.interpret_schema(self.schema["properties"])
+        # Interpretation is only done once, stored structure is returned on subsequent calls
+        if self.structure:
+            return self.structure
+
+        LOG.debug("Initial structure = %s", LazyDumps(self.schema))
+
+        self.structure = self.interpret_schema(self.schema["properties"])
 
         LOG.debug(
             "Interpreted structure = %s",
-            dumps(self.structure, indent=4, default=vars),
+            LazyDumps(self.structure),
         )
 
         return self.structure
@@ -7,15 +7,20 @@ Module containing collection of convenience functions internally used.
 exports:
     check_dir: Checks string path to directory, if none exists in destination then creates new.
     update_dict_with_parts: Inserts value in depth of nested dictionary using a sequence of keys to follow.
+    nested_dict_with_parts: Retrieves, or generates, nested dictionary using a sequence of keys to follow.
     merge_dicts: Merges two different dictionary in depth.
     filter_dict: Filters nested dictionary using sequence of keys to retrieve deep values.
     deep_get_from_schema: Retrieves deep values from schema while skipping known container keys.
     pattern_parts_match: Matches sequence of patterns to sequence of strings.
+    compile_pattern_parts: Compiles sequence of patterns to be matched repeatedly with pattern_parts_match.
     unpack_nested_value: Retrieves value from depth of nested single-width dictionary.
     math_check: Check mathematical expression with possible variable name replacement.
     filter_metadata: Filters metadata dictionary by matching patterns of sequences of keys.
     add_info_from_schema: Retrieves information from schema and annotates metadata with it.
     remove_directives_from_schema: Recursively removes custom interpreting directives from schema.
+    debug_dumps: Serializes object to indented JSON string for debug logging.
+    LazyDumps: Defers debug_dumps serialization to logging message emission.
+    json_loads: Deserializes JSON document using fastest available backend.
 
 Authors: Jose V., Matthias K.
 
@@ -23,16 +28,28 @@ Authors: Jose V., Matthias K.
 
 import logging
 
-from json import dumps
-from re import fullmatch
+from re import fullmatch, compile as re_compile, Pattern
+from stat import S_ISDIR
+from json import dumps as j_dumps, loads as j_loads
 from pathlib import Path
 from copy import deepcopy
 from collections.abc import Iterable
-from typing import Optional, Any, Tuple
+from typing import Optional, Any, Tuple, Union, List
 
 
 LOG = logging.getLogger(__name__)
 
+# Try to load orjson for faster (de)serialization
+# In case of failure, standard json module is used
+try:
+    from orjson import dumps as o_dumps, loads as o_loads, JSONEncodeError, OPT_INDENT_2
+
+    _USE_ORJSON = True
+
+except ImportError:
+    _USE_ORJSON = False
+
+
 # List of ignored JSON schema iterable keys
 IGNORED_ITERABLE_KEYWORDS = [
     "additionalProperties",
@@ -81,12 +98,18 @@ def check_dir(dir_path: str, allow_existing: bool = False) -> Tuple[Path, bool]:
     path = Path(dir_path)
 
     if str(path) != ".":
-        if path.exists():
+        # Single stat call for both existence and directory type checks
+        try:
+            path_stat = path.stat()
+        except FileNotFoundError:
+            path_stat = None
+
+        if path_stat is not None:
             if not allow_existing:
-                LOG.debug("directory path '%s'", str(path))
+                LOG.debug("directory path '%s'", path)
                 raise RuntimeError("Directory already exists.")
-            if not path.is_dir():
-                LOG.debug("found path '%s'", str(path))
+            if not S_ISDIR(path_stat.st_mode):
+                LOG.debug("found path '%s'", path)
                 raise NotADirectoryError("Incorrect path to directory.")
         else:
             path.mkdir(parents=True)
@@ -95,7 +118,73 @@ def check_dir(dir_path: str, allow_existing: bool = False) -> Tuple[Path, bool]:
     return path, False
 
 
-def update_dict_with_parts(target_dict: dict, value: Any, parts: list) -> None:
+def debug_dumps(obj: Any) -> str:
+    """
+    Serializes object to indented JSON string to be used in debug messages.
+    Uses orjson when available, otherwise or when orjson cannot serialize the object
+    (e.g. non string keys) falls back to the standard json module.
+    Objects without native JSON representation are serialized through their attribute dictionary.
+
+    Arguments:
+        obj: object to serialize.
+
+    Returns:
+        JSON formatted string.
+    """
+
+    if _USE_ORJSON:
+        try:
+            return o_dumps(obj, default=vars, option=OPT_INDENT_2).decode("utf-8")
+        except JSONEncodeError:
+            pass
+
+    return j_dumps(obj, indent=4, default=vars)
+
+
+class LazyDumps:
+    """
+    Wrapper deferring debug_dumps serialization of an object until conversion to string.
+    Used as logging argument such that serialization is only done if message is emitted.
+
+    Attributes:
+        obj: object to serialize.
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any) -> None:
+        """
+        Constructor of LazyDumps class.
+
+        Arguments:
+            obj: object to serialize.
+        """
+        self.obj = obj
+
+    def __str__(self) -> str:
+        """Returns JSON formatted string of wrapped object."""
+        return debug_dumps(self.obj)
+
+
+def json_loads(document: Union[bytes, str]) -> Any:
+    """
+    Deserializes JSON document.
+    Uses orjson when available, otherwise falls back to the standard json module.
+
+    Arguments:
+        document: bytes or string containing JSON document.
+
+    Returns:
+        deserialized object.
+    """
+
+    if _USE_ORJSON:
+        return o_loads(document)
+
+    return j_loads(document)
+
+
+def update_dict_with_parts(target_dict: dict, value: Any, parts: Union[list, tuple]) -> None:
     """
     In place, deep dictionary update.
     Generates and dynamically fills the target dictionary tree following a key sequence.
@@ -103,23 +192,40 @@ def update_dict_with_parts(target_dict: dict, value: Any, parts: list) -> None:
     Arguments:
         target_dict: dictionary where update takes place.
         value: object to insert.
-        parts: list of keys used to sequentially nest the tree. Last part is always used as key of value.
+        parts: list or tuple of keys used to sequentially nest the tree. Last part is always used as key of value.
+    """
+
+    nested_dict_with_parts(target_dict, parts[:-1])[parts[-1]] = value
+
+
+def nested_dict_with_parts(target_dict: dict, parts: Union[list, tuple]) -> dict:
+    """
+    In place, deep dictionary retrieval.
+    Follows key sequence in target dictionary tree, missing nested dictionaries are generated.
+
+    Arguments:
+        target_dict: dictionary where retrieval takes place.
+        parts: list or tuple of keys used to sequentially nest the tree.
+
+    Returns:
+        nested dictionary at end of key sequence.
     """
 
     # Get the parts of the relative path
     relative_root = target_dict
-    for part in parts[: len(parts) - 1]:
+    for part in parts:
         if part not in relative_root:
             relative_root[part] = {}
         elif not isinstance(relative_root[part], dict):
             LOG.debug(
                 "key %s\nrelative root = %s",
                 part,
-                dumps(relative_root, indent=4, default=vars),
+                LazyDumps(relative_root),
             )
             raise RuntimeError("Duplicate key with incorrect found while updating tree with path hierarchy.")
         relative_root = relative_root[part]
-    relative_root[parts[-1]] = value
+
+    return relative_root
 
 
 def merge_dicts(dict1: dict, dict2: dict) -> dict:
@@ -134,13 +240,10 @@ def merge_dicts(dict1: dict, dict2: dict) -> dict:
         dictionary combining both inputs.
     """
 
-    keys1 = list(dict1.keys())
-    keys2 = list(dict2.keys())
+    # Membership is checked directly on dictionaries, merged dictionary keeps order of keys of dict1 then dict2
     merged_dict = {}
-    for key in keys1:
-        if key in keys2:
-            keys2.remove(key)
-            val1 = dict1[key]
+    for key, val1 in dict1.items():
+        if key in dict2:
             val2 = dict2[key]
             if isinstance(val1, type(val2)):
                 if isinstance(val1, Iterable):
@@ -166,9 +269,10 @@ def merge_dicts(dict1: dict, dict2: dict) -> dict:
                 LOG.debug("val1 type '%s', val2 type '%s'", str(type(val1)), str(type(val2)))
                 raise TypeError("Type mismatch while merge dictionaries.")
         else:
-            merged_dict[key] = dict1[key]
-    for key in keys2:
-        merged_dict[key] = dict2[key]
+            merged_dict[key] = val1
+    for key, val2 in dict2.items():
+        if key not in dict1:
+            merged_dict[key] = val2
 
     return merged_dict
 
@@ -230,12 +334,12 @@ def deep_get_from_schema(schema: dict, keys: list) -> Any:
                 except StopIteration:
                     pass
 
-        LOG.debug("schema = %s", dumps(schema, indent=4, default=vars))
-        LOG.debug("keys = %s", dumps(keys, indent=4, default=vars))
+        LOG.debug("schema = %s", LazyDumps(schema))
+        LOG.debug("keys = %s", LazyDumps(keys))
         raise StopIteration("Iterated through schema without finding corresponding keys.")
 
-    LOG.debug("schema = %s", dumps(schema, indent=4, default=vars))
-    LOG.debug("keys = %s", dumps(keys, indent=4, default=vars))
+    LOG.debug("schema = %s", LazyDumps(schema))
+    LOG.debug("keys = %s", LazyDumps(keys))
     raise StopIteration("No key found for corresponding schema.")
 
 
@@ -247,7 +351,7 @@ def pattern_parts_match(pattern_parts: list, actual_parts: list, context: Option
     A context can be provided to process !varname instructions.
 
     Arguments:
-        pattern_pars: list of regex pattern parts.
+        pattern_pars: list of regex pattern parts, or compiled patterns (cf. compile_pattern_parts) without context.
         actual_parts: list of parts to compare with.
         context: Optional context dictionary.
 
@@ -259,10 +363,10 @@ def pattern_parts_match(pattern_parts: list, actual_parts: list, context: Option
     # We match through looping over the regex path in reverse order
     for i, part in enumerate(pattern_parts):
         # Match against varname
-        if fullmatch(r"\{\w+\}", part) and context is not None:
+        if context is not None and fullmatch(r"\{\w+\}", part):
             # !varname and regexp should always be in context in this case
             if "!varname" not in context or "regexp" not in context:
-                LOG.debug("context = %s", dumps(context, indent=4, default=vars))
+                LOG.debug("context = %s", LazyDumps(context))
                 raise RuntimeError("Badly structured context for pattern matching.")
 
             # Match against same index element in file path
@@ -282,6 +386,36 @@ def pattern_parts_match(pattern_parts: list, actual_parts: list, context: Option
     return is_match
 
 
+def compile_pattern_parts(pattern_parts: list, context: Optional[dict] = None) -> List[Pattern]:
+    """
+    Compiles path parts patterns, such that matching against multiple paths
+    with pattern_parts_match does not need to process patterns again.
+    As in pattern_parts_match, a context can be provided to process !varname instructions.
+
+    Arguments:
+        pattern_parts: list of regex pattern parts.
+        context: Optional context dictionary.
+
+    Returns:
+        list of compiled patterns, to be used with pattern_parts_match without context.
+    """
+
+    compiled_parts = []
+    for part in pattern_parts:
+        # Resolve varname
+        if context is not None and fullmatch(r"\{\w+\}", part):
+            # !varname and regexp should always be in context in this case
+            if "!varname" not in context or "regexp" not in context:
+                LOG.debug("context = %s", LazyDumps(context))
+                raise RuntimeError("Badly structured context for pattern matching.")
+
+            part = part.format(**{context["!varname"]: context["regexp"]})
+
+        compiled_parts.append(re_compile(part))
+
+    return compiled_parts
+
+
 def unpack_nested_value(iterable: Any, level: Optional[int] = None) -> Any:
     """
     Helper function to unpack any type of nested value
@@ -301,7 +435,7 @@ def unpack_nested_value(iterable: Any, level: Optional[int] = None) -> Any:
             LOG.debug(
                 "level %i\niterable = %s",
                 level,
-                dumps(iterable, indent=4, default=vars),
+                LazyDumps(iterable),
             )
             raise RuntimeError("Cannot further unpack iterable.")
         return iterable
@@ -310,7 +444,7 @@ def unpack_nested_value(iterable: Any, level: Optional[int] = None) -> Any:
         LOG.debug(
             "level %i\niterable = %s",
             level,
-            dumps(iterable, indent=4, default=vars),
+            LazyDumps(iterable),
         )
         raise IndexError("Multiple branching possible when unpacking nested value.")
 
@@ -503,10 +637,10 @@ def add_info_from_schema(
                 LOG.warning("No schema entry found for metadata value '%s'", key)
                 LOG.debug(
                     "key '%s' , value '%s'\nmetadata = %s\nschema = %s",
-                    str(key),
-                    str(value),
-                    dumps(metadata, indent=4, default=vars),
-                    dumps(schema, indent=4, default=vars),
+                    key,
+                    value,
+                    LazyDumps(metadata),
+                    LazyDumps(schema),
                 )
             if schema_entry is not None:
                 if add_description:
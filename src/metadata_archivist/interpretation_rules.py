@@ -30,11 +30,10 @@ Authors: Jose V., Matthias K.
 import logging
 
 from re import sub
-from json import dumps
 from typing import Callable
 from typing import Union, TYPE_CHECKING
 
-from metadata_archivist.helper_functions import math_check
+from metadata_archivist.helper_functions import math_check, LazyDumps
 
 if TYPE_CHECKING:
     from metadata_archivist.helper_classes import SchemaInterpreter, SchemaEntry
@@ -43,9 +42,7 @@ if TYPE_CHECKING:
 LOG = logging.getLogger(__name__)
 
 # Constants for schema specific/special values to be considered when parsing.
-_KNOWN_REFS = [
-    "#/$defs/",
-]
+_KNOWN_REFS = ("#/$defs/",)
 
 
 def _interpret_simple_property_rule(
@@ -95,7 +92,7 @@ def _interpret_varname_directive_rule(
 ) -> "SchemaEntry":
     # Check if regex context is present in current entry
     if "useRegex" not in entry.context:
-        LOG.debug("SchemaEntry context = %s", dumps(entry.context, indent=4, default=vars))
+        LOG.debug("SchemaEntry context = %s", LazyDumps(entry.context))
         raise RuntimeError("Contextless !varname found.")
     # Add a !varname context which contains the name to use
     # and to which expression it corresponds to.
@@ -112,11 +109,11 @@ def _interpret_reference_rule(
     entry: "SchemaEntry",
 ) -> "SchemaEntry":
     # Check if reference is well formed against knowledge base
-    if not any(prop_val.startswith(ss) for ss in _KNOWN_REFS):
+    if not prop_val.startswith(_KNOWN_REFS):
         LOG.debug(
             "Reference item ('%s' , %s)",
             prop_key,
-            dumps(prop_val, indent=4, default=vars),
+            LazyDumps(prop_val),
         )
         raise ValueError("Malformed reference prop_value.")
 
@@ -174,7 +171,7 @@ def _interpret_calculate_directive_rule(
         LOG.debug(
             "Directive item ('%s' , %s)",
             prop_key,
-            dumps(prop_val, indent=4, default=vars),
+            LazyDumps(prop_val),
         )
         raise ValueError("Malformed !calculate directive.")
 
@@ -199,7 +196,7 @@ def _interpret_calculate_directive_rule(
             "Expression '%s' , expression variables '%s' , defined variables = %s",
             expression,
             str(variable_names),
-            dumps(variables, indent=4, default=vars),
+            LazyDumps(variables),
         )
         raise RuntimeError("Variables count mismatch in !calculate directive.")
 
@@ -220,7 +217,7 @@ def _interpret_calculate_directive_rule(
             raise TypeError("Incorrect variable type in !calculate directive.")
 
         if not "$ref" in value:
-            LOG.debug("Variable content = %s", dumps(value, indent=4, default=vars))
+            LOG.debug("Variable content = %s", LazyDumps(value))
             raise RuntimeError("Variable does not reference a Parser in !calculate directive.")
 
         # We create a SchemaEntry in the context to be specially handled by the Formatter
@@ -88,6 +88,8 @@ class AParser(ABC):
         super().__init__()
         self._name = name
         self._input_file_pattern = input_file_pattern
+        # Split and reversed input file pattern, as expected by pattern_parts_match
+        self._reversed_pattern = input_file_pattern.split("/")[::-1]
         self._schema = schema
         self.validate_output = _DO_VALIDATE and validate_output
 
@@ -106,6 +108,7 @@ class AParser(ABC):
         Triggers parsers update.
         """
         self._input_file_pattern = pattern
+        self._reversed_pattern = pattern.split("/")[::-1]
         self._update_formatters()
 
     @property
@@ -191,9 +194,7 @@ class AParser(ABC):
             LOG.debug("Path '%s'", str(file_path))
             raise RuntimeError("Given path does not point to file.")
 
-        pattern = self.input_file_pattern.split("/")
-        pattern.reverse()
-        if pattern_parts_match(pattern, list(reversed(file_path.parts))):
+        if pattern_parts_match(self._reversed_pattern, file_path.parts[::-1]):
             parsed_metadata = self.parse(file_path)
             self.run_validation(parsed_metadata)
 
@@ -223,6 +224,15 @@ class AParser(ABC):
             except ValidationError as e:
                 LOG.warning(e.message)
 
+    def __getstate__(self) -> dict:
+        """
+        Class instance pickling method, used when parsing in separate processes.
+        Registered formatters are not part of the pickled state.
+        """
+        state = self.__dict__.copy()
+        state["_formatters"] = []
+        return state
+
     # Considering the name of the Parser as unique then we can use
     # the name property for equality/hashing
     def __eq__(self, other) -> bool:
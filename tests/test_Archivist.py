@@ -0,0 +1,103 @@
+"""
+Unit tests for the Archivist
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+import sys
+
+sys.path.append("src")
+from metadata_archivist.parser import AParser
+from metadata_archivist.archivist import Archivist, _COMPILE_CACHE_DIRECTORY
+
+
+class TextParser(AParser):
+    """Parser returning content of text files."""
+
+    def __init__(self):
+        super().__init__(name="text_parser", input_file_pattern=".*.txt", schema={"type": "object"})
+
+    def parse(self, file_path):
+        return {"content": file_path.read_text(encoding="utf-8")}
+
+
+class TestArchivist(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.explored_path = Path(self.temp_dir.name) / "explored"
+        self.explored_path.mkdir()
+        self.output_directory = Path(self.temp_dir.name) / "output"
+        for name in ("a.txt", "b.txt"):
+            (self.explored_path / name).write_text(name, encoding="utf-8")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def parse(self):
+        """Creates Archivist with compile cache enabled and parses explored directory."""
+        archivist = Archivist(
+            path=str(self.explored_path),
+            parsers=TextParser(),
+            output_directory=str(self.output_directory),
+            cache_compile=True,
+        )
+        archivist.parse()
+        return archivist
+
+    def test_cached_compile(self):
+        """
+        test compiled metadata cache is reused for unchanged inputs and invalidated by changed input files
+        """
+
+        archivist = self.parse()
+        digest = archivist._compile_digest()
+        metadata = archivist.get_metadata()
+
+        self.assertEqual(metadata, {"a.txt": {"content": "a.txt"}, "b.txt": {"content": "b.txt"}})
+        cache_file = self.output_directory / _COMPILE_CACHE_DIRECTORY / f"{digest}.pkl"
+        self.assertTrue(cache_file.is_file())
+
+        # Unchanged inputs load compiled metadata from cache
+        archivist = self.parse()
+        self.assertEqual(archivist._compile_digest(), digest)
+        with self.assertLogs("metadata_archivist.archivist", level="INFO") as logs:
+            self.assertEqual(archivist.get_metadata(), metadata)
+        self.assertTrue(any("Loading compiled metadata from cache" in message for message in logs.output))
+
+        # Changed input file changes digest and metadata is compiled again
+        (self.explored_path / "b.txt").write_text("changed", encoding="utf-8")
+        archivist = self.parse()
+        new_digest = archivist._compile_digest()
+        self.assertNotEqual(new_digest, digest)
+        self.assertEqual(archivist.get_metadata()["b.txt"], {"content": "changed"})
+        self.assertTrue((self.output_directory / _COMPILE_CACHE_DIRECTORY / f"{new_digest}.pkl").is_file())
+
+        # Cache directory is kept after clean up
+        self.assertTrue(cache_file.is_file())
+
+    def test_corrupted_cached_compile(self):
+        """
+        test truncated or corrupted compiled metadata cache entries are compiled and written again
+        """
+
+        archivist = self.parse()
+        metadata = archivist.get_metadata()
+        cache_file = self.output_directory / _COMPILE_CACHE_DIRECTORY / f"{archivist._compile_digest()}.pkl"
+
+        for content in (b"", b"not a pickle", cache_file.read_bytes()[:-3]):
+            with self.subTest(content=content[:16]):
+                cache_file.write_bytes(content)
+                archivist = self.parse()
+                with self.assertLogs("metadata_archivist.archivist", level="WARNING"):
+                    self.assertEqual(archivist.get_metadata(), metadata)
+
+                # Rewritten cache entry is loaded in next run, no temporary file is left behind
+                archivist = self.parse()
+                self.assertEqual(archivist.get_metadata(), metadata)
+                self.assertEqual(list(cache_file.parent.iterdir()), [cache_file])
+
+
+if __name__ == "__main__":
+    unittest.main()
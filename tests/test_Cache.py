@@ -3,6 +3,7 @@ Unit tests for the Cache
 """
 
 from pathlib import Path
+from tempfile import TemporaryDirectory
 import unittest
 import sys
 
@@ -80,6 +81,46 @@ class TestParserCache(unittest.TestCase):
         self.assertEqual(parser_cache[1].metadata, metadata2)
         # self.assertEqual(cache_extractor[1], cache_entry_1)
 
+    def test_parser_cache_shared_meta_file(self):
+        """
+        test saving metadata of ParserCache entries to a shared meta file in two batches and reloading it
+        """
+
+        with TemporaryDirectory() as temp_dir:
+            explored_path = Path(temp_dir)
+            meta_path = explored_path / "parser.meta.pkl"
+            metadata = [{"foo": i, "bar": list(range(i))} for i in range(5)]
+
+            parser_cache = ParserCache()
+            entries = [parser_cache.add(explored_path, explored_path / f"file{i}.txt") for i in range(5)]
+
+            # First batch creates meta file, second batch is appended to it
+            parser_cache.save_metadata(
+                [(entry, entry.dump_metadata(meta)) for entry, meta in zip(entries[:2], metadata[:2])], meta_path
+            )
+            size_first_batch = meta_path.stat().st_size
+            parser_cache.save_metadata(
+                [(entry, entry.dump_metadata(meta)) for entry, meta in zip(entries[2:], metadata[2:])], meta_path
+            )
+            self.assertGreater(meta_path.stat().st_size, size_first_batch)
+
+            for entry in entries:
+                self.assertEqual(entry.meta_path, meta_path)
+                self.assertIsNone(entry.metadata)
+
+            # Entries are loaded individually from both batches
+            self.assertEqual(entries[3].load_metadata(), metadata[3])
+            self.assertEqual(entries[0].load_metadata(), metadata[0])
+
+            # Remaining entries are loaded together
+            self.assertEqual(parser_cache.load_metadata(), metadata)
+
+            # New cache saving to same path overwrites meta file
+            new_cache = ParserCache()
+            new_entry = new_cache.add(explored_path, explored_path / "file0.txt")
+            new_cache.save_metadata([(new_entry, new_entry.dump_metadata(metadata[4]))], meta_path)
+            self.assertEqual(new_cache.load_metadata(), [metadata[4]])
+
 
 class TestCache(unittest.TestCase):
 
@@ -0,0 +1,52 @@
+"""
+Unit tests for the Explorer
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import tarfile
+import unittest
+import sys
+
+sys.path.append("src")
+from metadata_archivist.explorer import _dir_explore, _decompress_tar
+
+
+class TestExplorer(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.directory_path = Path(self.temp_dir.name) / "archive"
+        (self.directory_path / "sub").mkdir(parents=True)
+        for name in ("aa.txt", "bb.txt", "ab.txt", "sub/bb.txt", "sub/cc.log"):
+            (self.directory_path / name).write_text(name, encoding="utf-8")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_backreference_patterns(self):
+        """
+        test patterns with groups and backreferences are matched independently of each other
+        """
+
+        patterns = [r"(a)\1\.txt", r"(b)\1\.txt", r"sub/(?P<name>c)(?P=name)\.log"]
+        expected = ["aa.txt", "bb.txt", "sub/bb.txt", "sub/cc.log"]
+
+        _, _, explored_files = _dir_explore(patterns, self.directory_path)
+        self.assertEqual(sorted(fp.relative_to(self.directory_path).as_posix() for fp in explored_files), expected)
+
+        archive_path = Path(self.temp_dir.name) / "archive.tar"
+        with tarfile.open(archive_path, "w") as tar:
+            for name in sorted(fp.relative_to(self.directory_path).as_posix() for fp in self.directory_path.rglob("*")):
+                tar.add(self.directory_path / name, arcname=name, recursive=False)
+
+        extraction_directory = Path(self.temp_dir.name) / "extraction"
+        extraction_directory.mkdir()
+        root_path, _, explored_files = _decompress_tar(patterns, archive_path, extraction_directory)
+        self.assertEqual(sorted(fp.relative_to(root_path).as_posix() for fp in explored_files), expected)
+        for fp in explored_files:
+            self.assertTrue(fp.is_file())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Unit tests for the Exporter and export rules
+"""
+
+from pathlib import Path
+from importlib.util import find_spec
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import unittest
+import json
+import sys
+
+sys.path.append("src")
+from metadata_archivist.archivist import DEFAULT_CONFIG
+from metadata_archivist.exporter import Exporter
+from metadata_archivist import export_rules
+from metadata_archivist.export_rules import (
+    EXPORT_RULES,
+    register_export_rule,
+    _export_json,
+    _export_json_stream,
+    _export_msgpack,
+)
+
+
+class TestExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.config = DEFAULT_CONFIG.copy()
+        self.config["output_directory"] = self.temp_dir.name
+        self.output_file = Path(self.temp_dir.name) / self.config["output_file"]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_custom_rule(self):
+        """
+        test custom export rule with two argument signature
+        """
+
+        def custom(export_object, outfile):
+            outfile.write_text(repr(export_object), encoding="utf-8")
+
+        register_export_rule("custom_test", custom)
+        self.addCleanup(EXPORT_RULES.pop, "CUSTOM_TEST")
+
+        self.config["output_format"] = "custom_test"
+        Exporter(self.config).export({"foo": "bar"})
+
+        self.assertEqual(self.output_file.read_text(encoding="utf-8"), repr({"foo": "bar"}))
+
+    def test_json_indent(self):
+        """
+        test JSON indentation configuration
+        """
+
+        metadata = {"foo": {"bar": [1, 2]}}
+        exporter = Exporter(self.config)
+
+        exporter.export(metadata)
+        self.assertEqual(self.output_file.read_text(encoding="utf-8"), json.dumps(metadata, separators=(",", ":")))
+
+        self.config["json_indent"] = 4
+        exporter.export(metadata)
+        self.assertEqual(self.output_file.read_text(encoding="utf-8"), json.dumps(metadata, indent=4))
+
+    def test_config_without_json_indent(self):
+        """
+        test export with configuration lacking optional keys
+        """
+
+        config = {
+            "output_directory": self.temp_dir.name,
+            "output_file": "metadata.json",
+            "output_format": "JSON",
+            "overwrite": True,
+        }
+        metadata = {"foo": {"bar": [1, 2]}}
+
+        Exporter(config).export(metadata)
+
+        self.assertEqual(self.output_file.read_text(encoding="utf-8"), json.dumps(metadata, separators=(",", ":")))
+
+
+class TestExportRules(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.outfile = Path(self.temp_dir.name) / "metadata.json"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_json_non_finite(self):
+        """
+        test JSON export of non-finite floats matches json module with and without orjson
+        """
+
+        metadata = {"nan": float("nan"), "inf": [float("inf"), -float("inf")], "none": None}
+        expected = '{"nan":NaN,"inf":[Infinity,-Infinity],"none":null}'
+
+        for use_orjson in (export_rules._USE_ORJSON, False):
+            with patch.object(export_rules, "_USE_ORJSON", use_orjson):
+                _export_json(metadata, self.outfile)
+            self.assertEqual(self.outfile.read_text(encoding="utf-8"), expected)
+
+            with patch.object(export_rules, "_USE_ORJSON", use_orjson):
+                _export_json(metadata, self.outfile, indent=2)
+            self.assertEqual(self.outfile.read_text(encoding="utf-8"), json.dumps(metadata, indent=2))
+
+    def test_json_stream(self):
+        """
+        test streamed JSON export parses to same object as JSON export, with and without orjson
+        """
+
+        metadata = {
+            "nested": {"list": [1, [2.5, {"deep": [None, True, False]}], {"empty": {}}], "empty": []},
+            "tuple": (1, (2, 3), ["a"]),
+            1: "int key",
+            2.5: "float key",
+            False: "bool key",
+            None: "null key",
+            'escaped "quotes" \\ backslash': "line\nbreak\ttab \x00 control",
+            "unicode \u00e9\u4e2d\U0001f600": "\u2028 separator",
+        }
+        stream_file = Path(self.temp_dir.name) / "stream.json"
+
+        for use_orjson in (export_rules._USE_ORJSON, False):
+            with patch.object(export_rules, "_USE_ORJSON", use_orjson):
+                _export_json(metadata, self.outfile)
+                _export_json_stream(metadata, stream_file)
+            self.assertEqual(
+                json.loads(stream_file.read_text(encoding="utf-8")),
+                json.loads(self.outfile.read_text(encoding="utf-8")),
+            )
+
+            # Non-finite floats are written as by json module, also in lists encoded at once
+            with patch.object(export_rules, "_USE_ORJSON", use_orjson):
+                _export_json_stream(
+                    {"nan": float("nan"), "list": [float("inf")], "nested": [[-float("inf")]]}, stream_file
+                )
+            self.assertEqual(
+                stream_file.read_text(encoding="utf-8"), '{"nan":NaN,"list":[Infinity],"nested":[[-Infinity]]}'
+            )
+
+        with self.assertRaises(TypeError):
+            _export_json_stream({(1, 2): "tuple key"}, stream_file)
+
+    @unittest.skipIf(find_spec("msgpack") is None, "msgpack package not found")
+    def test_msgpack(self):
+        """
+        test MessagePack export round trip
+        """
+
+        from msgpack import unpackb
+
+        metadata = {"nested": {"list": [1, 2.5, None, True, "text"]}, "bytes": b"\x00\xff", "unicode": "\u00e9"}
+        outfile = Path(self.temp_dir.name) / "metadata.msgpack"
+
+        _export_msgpack(metadata, outfile)
+
+        self.assertEqual(unpackb(outfile.read_bytes(), raw=False), metadata)
+
+    def test_msgpack_missing(self):
+        """
+        test MessagePack export without msgpack package
+        """
+
+        outfile = Path(self.temp_dir.name) / "metadata.msgpack"
+
+        with patch.dict(sys.modules, {"msgpack": None}):
+            with self.assertRaisesRegex(ModuleNotFoundError, "msgpack extra"):
+                _export_msgpack({"foo": "bar"}, outfile)
+
+        self.assertFalse(outfile.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
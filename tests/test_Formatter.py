@@ -0,0 +1,143 @@
+"""
+Unit tests for the Formatter
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+import sys
+
+sys.path.append("src")
+from metadata_archivist.parser import AParser
+from metadata_archivist.archivist import DEFAULT_CONFIG
+from metadata_archivist.formatter import Formatter, _meta_file_name
+
+
+class TextParser(AParser):
+    """Parser returning file name and content of text files."""
+
+    def __init__(self, name, input_file_pattern):
+        super().__init__(name=name, input_file_pattern=input_file_pattern, schema={"type": "object"})
+
+    def parse(self, file_path):
+        return {"name": file_path.name, "content": file_path.read_text(encoding="utf-8")}
+
+
+class TestFormatter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.explored_path = Path(self.temp_dir.name)
+        self.file_paths = []
+        for directory in ("a", "b"):
+            (self.explored_path / directory).mkdir()
+            for name in ("x.txt", "y.txt", "z.log"):
+                file_path = self.explored_path / directory / name
+                file_path.write_text(f"{directory}/{name}", encoding="utf-8")
+                self.file_paths.append(file_path)
+        self.config = DEFAULT_CONFIG.copy()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_remove_parser(self):
+        """
+        test removing Parser from Formatter with and without schema
+        """
+
+        for schema in (None, {"type": "object", "properties": {}}):
+            with self.subTest(schema=schema):
+                parsers = [
+                    TextParser("x_parser", "x.txt"),
+                    TextParser("y_parser", "y.txt"),
+                    TextParser("log", ".*.log"),
+                ]
+                formatter = Formatter(parsers, schema, self.config)
+
+                formatter.remove_parser(parsers[0])
+
+                self.assertEqual(formatter.parsers, parsers[1:])
+                self.assertEqual(formatter.input_file_patterns, ["y.txt", ".*.log"])
+                self.assertEqual(parsers[0]._formatters, [])
+                self.assertEqual(formatter.get_parser("x_parser"), (None, None))
+                if schema is not None:
+                    self.assertNotIn("x_parser", formatter.schema["$defs"])
+                    self.assertEqual(len(formatter.schema["$defs"]["node"]["properties"]["anyOf"]), 2)
+
+                # Remaining Parsers are still matched to their files
+                formatter.parse_files(self.explored_path, self.file_paths)
+                for parser_name, file_name in (("y_parser", "y.txt"), ("log", "z.log")):
+                    parser_cache = formatter.get_parser(parser_name)[1]
+                    self.assertEqual([entry.file_path.name for entry in parser_cache], [file_name, file_name])
+
+                # Updating a Parser after removal uses shifted indexes
+                if schema is not None:
+                    parsers[2].input_file_pattern = "x.txt"
+                    self.assertEqual(formatter.input_file_patterns, ["y.txt", "x.txt"])
+                    self.assertEqual(
+                        formatter.schema["$defs"]["node"]["properties"]["anyOf"][1],
+                        {"$ref": parsers[2].get_reference()},
+                    )
+
+    def test_parsing_workers(self):
+        """
+        test parsing in process pool gives same cache contents and order as parsing in current process
+        """
+
+        cache_contents = {}
+        for lazy_load in (False, True):
+            for parsing_workers in (1, 2):
+                config = self.config.copy()
+                config["parsing_workers"] = parsing_workers
+                config["lazy_load"] = lazy_load
+                parsers = [TextParser("txt_parser", ".*.txt"), TextParser("x_parser", "a/x.txt")]
+                formatter = Formatter(parsers, None, config)
+
+                meta_files = formatter.parse_files(self.explored_path, self.file_paths)
+                self.assertEqual(len(meta_files), 2 if lazy_load else 0)
+                # Pickling Parsers for worker processes leaves registered formatters untouched
+                self.assertEqual(parsers[0]._formatters, [formatter])
+
+                contents = {}
+                for parser in parsers:
+                    parser_cache = formatter.get_parser(parser.name)[1]
+                    metadata = parser_cache.load_metadata()
+                    contents[parser.name] = [(entry.rel_path, meta) for entry, meta in zip(parser_cache, metadata)]
+                cache_contents[lazy_load, parsing_workers] = contents
+
+                for meta_file in meta_files:
+                    meta_file.unlink()
+
+        expected = cache_contents[False, 1]
+        self.assertEqual(
+            [rel_path for rel_path, _ in expected["txt_parser"]],
+            [Path("a/x.txt"), Path("a/y.txt"), Path("b/x.txt"), Path("b/y.txt")],
+        )
+        self.assertEqual(expected["x_parser"], [(Path("a/x.txt"), {"name": "x.txt", "content": "a/x.txt"})])
+        for key, contents in cache_contents.items():
+            with self.subTest(lazy_load=key[0], parsing_workers=key[1]):
+                self.assertEqual(contents, expected)
+
+
+class TestMetaFileName(unittest.TestCase):
+
+    def test_meta_file_name(self):
+        """
+        test meta file names of Parsers are single distinct file names
+        """
+
+        names = ["parser", "a/b", "a_b", "../parser", "..", "/abs/path", "a\\b", "p" * 300]
+        file_names = [_meta_file_name(name) for name in names]
+
+        self.assertEqual(len(set(file_names)), len(names))
+        for file_name in file_names:
+            self.assertNotIn("/", file_name)
+            self.assertNotIn("\\", file_name)
+            self.assertTrue(file_name.endswith(".meta.pkl"))
+            self.assertLessEqual(len(file_name), 255)
+
+        self.assertTrue(_meta_file_name("parser").startswith("parser."))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Unit tests for the formatting rules
+"""
+
+from decimal import Decimal
+from fractions import Fraction
+import unittest
+import sys
+
+sys.path.append("src")
+from metadata_archivist.formatting_rules import _compile_expression, _evaluate_expression
+
+
+def calculate(expression, **values):
+    """Compiles and evaluates expression with variable values given by name."""
+    tree, variables = _compile_expression(expression)
+    return _evaluate_expression(tree, [values[variable] for variable in variables])
+
+
+class TestCalculateExpression(unittest.TestCase):
+
+    def test_operators(self):
+        """
+        test allowed arithmetic operators and precedence
+        """
+
+        self.assertEqual(calculate("{a} + {b}", a=2, b=3), 5)
+        self.assertEqual(calculate("{a} - {b}", a=2, b=3), -1)
+        self.assertEqual(calculate("{a} * {b}", a=2, b=3), 6)
+        self.assertEqual(calculate("{a} / {b}", a=3, b=2), 1.5)
+        self.assertEqual(calculate("{a} % {b}", a=7, b=3), 1)
+        self.assertEqual(calculate("({a} + 1) * 2.5 - {a} / 4", a=2), 7.0)
+
+    def test_variable_substitution(self):
+        """
+        test variable placeholders are substituted by values
+        """
+
+        _, variables = _compile_expression("{val1} * {val2} + {val1}")
+        self.assertEqual(variables, ("val1", "val2"))
+        self.assertEqual(calculate("{val1} * {val2} + {val1}", val1=3, val2=4), 15)
+
+        # String values are evaluated as numerical literals
+        self.assertEqual(calculate("{a} + {b}", a="1.5", b="2"), 3.5)
+        with self.assertRaises(ValueError):
+            calculate("{a} + 1", a="not a number")
+
+    def test_numerical_types(self):
+        """
+        test any numerical type is accepted except booleans
+        """
+
+        self.assertEqual(calculate("{a} + {b}", a=Decimal("1.5"), b=Decimal("2")), Decimal("3.5"))
+        self.assertEqual(calculate("{a} * 2", a=Fraction(1, 3)), Fraction(2, 3))
+
+        for value in (True, None, [1], {"a": 1}):
+            with self.assertRaises(TypeError):
+                calculate("{a} + 1", a=value)
+
+    def test_rejected_elements(self):
+        """
+        test calls, attributes, names, and other operators are rejected
+        """
+
+        for expression in (
+            "__import__('os')",
+            "{a}.real",
+            "abs({a})",
+            "x + {a}",
+            "_5 + {a}",
+            "{a} ** 2",
+            "{a} // 2",
+            "-{a}",
+            "[{a}]",
+            "'text'",
+            "True + {a}",
+        ):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    calculate(expression, a=1)
+
+        with self.assertRaises(ValueError):
+            _compile_expression("{a} +")
+
+
+if __name__ == "__main__":
+    unittest.main()